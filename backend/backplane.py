@@ -0,0 +1,271 @@
+import asyncio
+import bisect
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+Handler = Callable[[str], Union[None, Awaitable[None]]]
+RECONNECT_BACKOFF = (0.1, 5.0)  # first and longest wait, in seconds, between attempts to restore a lost subscriber
+
+# --- HASH RING ---
+
+class HashRing:
+    """Consistent hash of room ids onto workers, so membership changes only move ~1/N of the rooms."""
+    def __init__(self, nodes: List[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self.keys: List[int] = []
+        self.owners: List[str] = []
+        for node in nodes: self.add(node)
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def add(self, node: str):
+        for i in range(self.replicas):
+            h = self.hash(f"{node}#{i}")
+            idx = bisect.bisect(self.keys, h)
+            self.keys.insert(idx, h)
+            self.owners.insert(idx, node)
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self.keys: return None
+        idx = bisect.bisect(self.keys, self.hash(key)) % len(self.keys)
+        return self.owners[idx]
+
+# --- BACKPLANES ---
+
+class Backplane:
+    """Cross-worker transport: ordered pub/sub plus a small key/value store for room claims and handoff.
+    A channel may have several subscribers; unsubscribe drops one handler, or all if none is given.
+    `connected` is False while messages may be missed, e.g. while a subscriber connection is being restored."""
+    connected = True
+
+    async def start(self): pass
+    async def close(self): pass
+    async def publish(self, channel: str, message: str): raise NotImplementedError
+    async def subscribe(self, channel: str, handler: Handler): raise NotImplementedError
+    async def unsubscribe(self, channel: str, handler: Optional[Handler] = None): raise NotImplementedError
+    async def set(self, key: str, value: str, nx: bool = False) -> bool: raise NotImplementedError
+    async def get(self, key: str) -> Optional[str]: raise NotImplementedError
+    async def delete(self, key: str): raise NotImplementedError
+
+async def dispatch(handler: Handler, message: str):
+    try:
+        result = handler(message)
+        if asyncio.iscoroutine(result): await result
+    except Exception as e: print(f"Backplane handler error: {e}")
+
+def remove_handler(handlers: Dict[str, List[Handler]], channel: str, handler: Optional[Handler]) -> bool:
+    """Drops one subscriber (all if handler is None); True if the channel has none left."""
+    subscribed = handlers.get(channel, [])
+    if handler is None: subscribed.clear()
+    elif handler in subscribed: subscribed.remove(handler)
+    if subscribed: return False
+    handlers.pop(channel, None)
+    return True
+
+class InProcessBackplane(Backplane):
+    """Single-process backplane: handlers run inline, so delivery order matches publish order.
+    Several workers (e.g. Clusters in a test) can share one instance."""
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.store: Dict[str, str] = {}
+
+    async def publish(self, channel: str, message: str):
+        for handler in list(self.handlers.get(channel, ())): await dispatch(handler, message)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel: str, handler: Optional[Handler] = None):
+        remove_handler(self.handlers, channel, handler)
+
+    async def set(self, key: str, value: str, nx: bool = False) -> bool:
+        if nx and key in self.store: return False
+        self.store[key] = value
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    async def delete(self, key: str):
+        self.store.pop(key, None)
+
+# --- RESP (REDIS PROTOCOL) ---
+
+def bulk(value: str) -> bytes:
+    data = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+def encode_command(*args: str) -> bytes:
+    return b"*%d\r\n" % len(args) + b"".join(bulk(arg) for arg in args)
+
+async def read_reply(reader: asyncio.StreamReader):
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, rest = line[:1], line[1:]
+    if kind == b"+": return rest.decode()
+    if kind == b"-": raise RuntimeError(rest.decode())
+    if kind == b":": return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0: return None
+        return (await reader.readexactly(size + 2))[:-2].decode()
+    if kind == b"*":
+        size = int(rest)
+        if size < 0: return None
+        return [await read_reply(reader) for _ in range(size)]
+    raise RuntimeError(f"Bad RESP reply: {line!r}")
+
+class RespBackplane(Backplane):
+    """Backplane over the Redis wire protocol. Works against Redis or the stand-in from serve()."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        self.host, self.port = host, port
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.lock = asyncio.Lock()
+        self.cmd: Optional[tuple] = None
+        self.sub: Optional[tuple] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    @classmethod
+    def from_url(cls, url: str) -> "RespBackplane":
+        host, _, port = url.split("://", 1)[-1].rstrip("/").partition(":")
+        return cls(host or "127.0.0.1", int(port or 6379))
+
+    async def start(self):
+        # Redis connections in subscribe mode can't run other commands, hence two sockets
+        self.cmd = await asyncio.open_connection(self.host, self.port)
+        await self.resubscribe()
+        self.reader_task = asyncio.create_task(self.read_messages())
+
+    async def close(self):
+        if self.reader_task: self.reader_task.cancel()
+        for conn in (self.cmd, self.sub):
+            if conn: conn[1].close()
+
+    async def command(self, *args: str):
+        async with self.lock:
+            if not self.cmd: self.cmd = await asyncio.open_connection(self.host, self.port)
+            reader, writer = self.cmd
+            try:
+                writer.write(encode_command(*args))
+                await writer.drain()
+                return await read_reply(reader)
+            except (OSError, asyncio.IncompleteReadError):
+                writer.close()
+                self.cmd = None  # reopened by the next command
+                raise
+
+    async def resubscribe(self):
+        """Opens the subscriber connection and subscribes it to every channel that has handlers."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.sub = (reader, writer)
+        if self.handlers:
+            writer.write(encode_command("SUBSCRIBE", *self.handlers))
+            await writer.drain()
+        self.connected = True
+
+    async def read_messages(self):
+        delay = RECONNECT_BACKOFF[0]
+        while True:
+            try:
+                if not self.sub: await self.resubscribe()
+                delay = RECONNECT_BACKOFF[0]
+                while True:
+                    reply = await read_reply(self.sub[0])
+                    if isinstance(reply, list) and reply[0] == "message":
+                        for handler in list(self.handlers.get(reply[1], ())): await dispatch(handler, reply[2])
+            except asyncio.CancelledError: return
+            except (OSError, asyncio.IncompleteReadError) as e:
+                # Messages published until we resubscribe are lost; `connected` tells the cluster not to trust the silence
+                self.connected = False
+                if self.sub: self.sub[1].close()
+                self.sub = None
+                print(f"Backplane subscriber lost: {e!r}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_BACKOFF[1])
+
+    async def send_subscription(self, *args: str):
+        if not self.sub: return  # resubscribe() covers it on reconnect
+        try:
+            self.sub[1].write(encode_command(*args))
+            await self.sub[1].drain()
+        except OSError as e: print(f"Backplane {args[0]} deferred: {e!r}")
+
+    async def publish(self, channel: str, message: str):
+        await self.command("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        subscribed = self.handlers.setdefault(channel, [])
+        subscribed.append(handler)
+        if len(subscribed) == 1: await self.send_subscription("SUBSCRIBE", channel)
+
+    async def unsubscribe(self, channel: str, handler: Optional[Handler] = None):
+        if remove_handler(self.handlers, channel, handler): await self.send_subscription("UNSUBSCRIBE", channel)
+
+    async def set(self, key: str, value: str, nx: bool = False) -> bool:
+        return await self.command("SET", key, value, *(["NX"] if nx else [])) == "OK"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.command("GET", key)
+
+    async def delete(self, key: str):
+        await self.command("DEL", key)
+
+# --- LOCAL STAND-IN SERVER ---
+
+async def serve(host: str = "127.0.0.1", port: int = 6380):
+    """Minimal Redis stand-in (PING, PUBLISH, SUBSCRIBE, UNSUBSCRIBE, SET [NX], GET, DEL) for local multi-worker runs."""
+    store: Dict[str, str] = {}
+    subscribers: Dict[str, List[asyncio.StreamWriter]] = {}
+
+    async def client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channels: List[str] = []
+        try:
+            while True:
+                args = await read_reply(reader)
+                if not isinstance(args, list) or not args: break
+                cmd = args[0].upper()
+                if cmd == "PING": writer.write(b"+PONG\r\n")
+                elif cmd == "PUBLISH":
+                    targets = subscribers.get(args[1], [])
+                    for target in targets: target.write(encode_command("message", args[1], args[2]))
+                    writer.write(b":%d\r\n" % len(targets))
+                elif cmd == "SUBSCRIBE":
+                    for channel in args[1:]:
+                        subscribers.setdefault(channel, []).append(writer)
+                        channels.append(channel)
+                        writer.write(b"*3\r\n" + bulk("subscribe") + bulk(channel) + b":%d\r\n" % len(channels))
+                elif cmd == "UNSUBSCRIBE":
+                    for channel in args[1:]:
+                        if channel in channels:
+                            channels.remove(channel)
+                            subscribers[channel].remove(writer)
+                            if not subscribers[channel]: del subscribers[channel]
+                        writer.write(b"*3\r\n" + bulk("unsubscribe") + bulk(channel) + b":%d\r\n" % len(channels))
+                elif cmd == "SET":
+                    if "NX" in (a.upper() for a in args[3:]) and args[1] in store: writer.write(b"$-1\r\n")
+                    else:
+                        store[args[1]] = args[2]
+                        writer.write(b"+OK\r\n")
+                elif cmd == "GET":
+                    value = store.get(args[1])
+                    writer.write(b"$-1\r\n" if value is None else bulk(value))
+                elif cmd == "DEL":
+                    writer.write(b":%d\r\n" % sum(store.pop(k, None) is not None for k in args[1:]))
+                else: writer.write(f"-ERR unknown command '{cmd}'\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError): pass
+        finally:
+            for channel in channels:
+                subscribers[channel].remove(writer)
+                if not subscribers[channel]: del subscribers[channel]
+            writer.close()
+
+    server = await asyncio.start_server(client, host, port)
+    print(f"Backplane stand-in listening on {host}:{port}")
+    async with server: await server.serve_forever()
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 6380))
@@ -0,0 +1,334 @@
+"""WebSocket load generator and latency benchmark for the game server.
+
+Spawns rooms full of synthetic players against a fresh server per scenario: drawers replay
+random-walk strokes at pointermove rate (with the odd fill and undo), guessers chat wrong and
+right guesses, and a churn loop keeps players leaving and rejoining. Results are JSON so runs
+can be diffed between releases:
+
+    python bench.py --rooms 1,10,50 --players 2,4,8 --duration 10 --out bench.json
+    python bench.py --rooms 10 --players 8 --baseline bench.json   # flags regressions
+
+Message latency is measured end to end inside this process: senders stamp perf_counter() into
+draw frames and chat text, and every recipient records the difference.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import websockets
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DRAW_HZ = 60                # pointermove events per second while a stroke is in progress
+CHAT_INTERVAL = 3.0         # mean seconds between guesses per guesser
+CORRECT_GUESS_RATE = 0.05   # share of guesses that are the actual word
+UNDO_RATE = 0.1             # share of strokes followed by an undo
+FILL_RATE = 0.05            # share of strokes that are bucket fills
+CHURN_INTERVAL = 2.0        # seconds between a random player leaving and a new one joining, per room
+LAG_PROBE_INTERVAL = 0.05
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples: return {"n": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"n": len(ordered), "p50": round(pick(0.5), 3), "p95": round(pick(0.95), 3), "p99": round(pick(0.99), 3), "max": round(ordered[-1], 3)}
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1])
+    except OSError: return None
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# --- SERVER PROCESS ---
+
+class LagProbe:
+    """Measures how late a fixed-interval sleep wakes up, i.e. event-loop lag."""
+    def __init__(self):
+        self.samples: List[float] = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.samples.append((time.perf_counter() - start - LAG_PROBE_INTERVAL) * 1000)
+
+def serve(port: int, conn):
+    """Child process: runs the app under uvicorn and answers lag queries over the pipe."""
+    import uvicorn
+    import main
+
+    async def run():
+        probe = LagProbe()
+        asyncio.create_task(probe.run())
+        def on_command():
+            if conn.recv() == "stats": conn.send(percentiles(probe.samples))
+            probe.samples = []
+        asyncio.get_running_loop().add_reader(conn.fileno(), on_command)
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        await server.serve()
+
+    asyncio.run(run())
+
+# --- SYNTHETIC PLAYERS ---
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.latency: Dict[str, List[float]] = {"draw": [], "chat": [], "undo": [], "join": []}
+
+class Player:
+    def __init__(self, bench: "Scenario", room_id: str, name: str):
+        self.bench = bench
+        self.room_id = room_id
+        self.name = name
+        self.rng = random.Random(name)
+        self.ws = None
+        self.role = "guesser"
+        self.activity: Optional[asyncio.Task] = None
+        self.undo_sent: List[float] = []
+
+    async def send(self, message: dict):
+        await self.ws.send(msgpack.packb(message) if self.bench.binary else json.dumps(message))
+        self.bench.stats.sent += 1
+
+    async def run(self):
+        stats = self.bench.stats
+        start = time.perf_counter()
+        try:
+            subprotocols = ["skribbl.msgpack"] if self.bench.binary else None
+            async with websockets.connect(f"{self.bench.url}/ws/{self.room_id}/{self.name}{self.bench.query}",
+                                          max_queue=None, subprotocols=subprotocols) as ws:
+                self.ws = ws
+                async for raw in ws:
+                    now = time.perf_counter()
+                    stats.received += 1
+                    msg = msgpack.unpackb(raw) if isinstance(raw, bytes) else json.loads(raw)
+                    kind = msg.get("type")
+                    if kind == "game_state":
+                        stats.latency["join"].append((now - start) * 1000)
+                        self.set_role(msg.get("role"))
+                    elif kind in ("draw", "draw_batch") and "t" in msg:
+                        stats.latency["draw"].append((now - msg["t"]) * 1000)
+                    elif kind == "chat" and " guess " in msg.get("message", ""):
+                        stats.latency["chat"].append((now - float(msg["message"].rsplit(" ", 1)[1])) * 1000)
+                    elif kind == "undo_stroke" and self.undo_sent:
+                        stats.latency["undo"].append((now - self.undo_sent.pop(0)) * 1000)
+                    elif kind == "choose_word":
+                        await self.send({"type": "word_select", "word": msg["words"][0]})
+                    elif kind == "new_round":
+                        if msg.get("role") == "drawer": self.bench.words[self.room_id] = msg["word"]
+                        self.set_role(msg.get("role"))
+                    elif kind == "choosing":
+                        self.set_role("guesser")
+        except (websockets.ConnectionClosed, OSError): pass
+        finally:
+            if self.activity: self.activity.cancel()
+
+    def set_role(self, role: str):
+        if self.activity and role == self.role: return
+        self.role = role
+        if self.activity: self.activity.cancel()
+        self.activity = asyncio.create_task(self.draw() if role == "drawer" else self.guess())
+
+    async def draw(self):
+        rng = self.rng
+        try:
+            while True:
+                stroke_id = f"{self.name}-{time.perf_counter()}"
+                x, y = rng.uniform(0, 800), rng.uniform(0, 600)
+                if rng.random() < FILL_RATE:
+                    await self.send({"type": "fill", "x": x, "y": y, "color": "#ef4444", "strokeId": stroke_id})
+                else:
+                    heading = rng.uniform(0, 2 * math.pi)
+                    for _ in range(rng.randint(20, 120)):
+                        heading += rng.gauss(0, 0.3)
+                        step = rng.uniform(2, 8)
+                        nx, ny = min(800, max(0, x + step * math.cos(heading))), min(600, max(0, y + step * math.sin(heading)))
+                        await self.send({
+                            "type": "draw", "prevX": x, "prevY": y, "currX": nx, "currY": ny,
+                            "color": "#000000", "strokeId": stroke_id, "t": time.perf_counter()
+                        })
+                        x, y = nx, ny
+                        await asyncio.sleep(1 / DRAW_HZ)
+                if rng.random() < UNDO_RATE:
+                    self.undo_sent.append(time.perf_counter())
+                    await self.send({"type": "undo"})
+                await asyncio.sleep(rng.uniform(0.2, 0.8))
+        except (asyncio.CancelledError, websockets.ConnectionClosed): pass
+
+    async def guess(self):
+        rng = self.rng
+        try:
+            while True:
+                await asyncio.sleep(rng.expovariate(1 / CHAT_INTERVAL))
+                word = self.bench.words.get(self.room_id)
+                if word and rng.random() < CORRECT_GUESS_RATE: await self.send({"type": "chat", "message": word})
+                else: await self.send({"type": "chat", "message": f"{self.name} guess {time.perf_counter()}"})
+        except (asyncio.CancelledError, websockets.ConnectionClosed): pass
+
+# --- SCENARIOS ---
+
+class Scenario:
+    def __init__(self, url: str, rooms: int, players: int, duration: float, tick: int, binary: bool = False):
+        self.url = url
+        self.binary = binary
+        self.rooms = rooms
+        self.players = players
+        self.duration = duration
+        self.query = f"?tick={tick}" if tick else ""
+        self.stats = Stats()
+        self.words: Dict[str, str] = {}
+        self.tasks: Dict[str, List[asyncio.Task]] = {}
+        self.joined = 0
+
+    def spawn(self, room_id: str):
+        self.joined += 1
+        player = Player(self, room_id, f"p{self.joined}")
+        self.tasks[room_id].append(asyncio.create_task(player.run()))
+
+    async def churn(self, room_id: str):
+        rng = random.Random(room_id)
+        while True:
+            await asyncio.sleep(rng.expovariate(1 / CHURN_INTERVAL))
+            tasks = self.tasks[room_id]
+            tasks.pop(rng.randrange(len(tasks))).cancel()
+            self.spawn(room_id)
+
+    async def run(self) -> dict:
+        for r in range(self.rooms):
+            room_id = f"BENCH{r}"
+            self.tasks[room_id] = []
+            for _ in range(self.players): self.spawn(room_id)
+        await asyncio.sleep(1)  # let joins settle before measuring throughput
+        self.stats.sent = self.stats.received = 0
+        churners = [asyncio.create_task(self.churn(room_id)) for room_id in self.tasks]
+        await asyncio.sleep(self.duration)
+        result = {
+            "rooms": self.rooms, "players_per_room": self.players, "duration_s": self.duration,
+            "sent_per_s": round(self.stats.sent / self.duration, 1),
+            "received_per_s": round(self.stats.received / self.duration, 1),
+            "latency_ms": {kind: percentiles(samples) for kind, samples in self.stats.latency.items()}
+        }
+        for task in churners + [t for tasks in self.tasks.values() for t in tasks]: task.cancel()
+        return result
+
+async def run_scenario(args, rooms: int, players: int) -> dict:
+    if args.url:
+        return await Scenario(args.url, rooms, players, args.duration, args.tick, args.binary).run()
+    port = free_port()
+    parent, child = mp.Pipe()
+    server = mp.get_context("spawn").Process(target=serve, args=(port, child), daemon=True)
+    server.start()
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError: await asyncio.sleep(0.1)
+        baseline = rss_kb(server.pid)
+        parent.send("reset")
+        result = await Scenario(f"ws://127.0.0.1:{port}", rooms, players, args.duration, args.tick, args.binary).run()
+        parent.send("stats")
+        result["loop_lag_ms"] = parent.recv()
+        rss = rss_kb(server.pid)
+        if rss and baseline:
+            result["rss_kb"] = rss
+            result["rss_per_room_kb"] = round((rss - baseline) / rooms, 1)
+            result["rss_per_conn_kb"] = round((rss - baseline) / (rooms * players), 1)
+        return result
+    finally:
+        server.terminate()
+        server.join()
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Lists metrics that got worse than the baseline run by more than `tolerance` (a fraction)."""
+    with open(baseline_path) as f:
+        baseline = {(r["rooms"], r["players_per_room"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get((result["rooms"], result["players_per_room"]))
+        if not old: continue
+        checks = [("received_per_s", result["received_per_s"], old["received_per_s"], False)]
+        for kind, stats in result["latency_ms"].items():
+            old_n = old["latency_ms"].get(kind, {}).get("n")
+            if old_n and not stats.get("n"):
+                regressions.append(f"{result['rooms']}x{result['players_per_room']} latency_ms.{kind}: no samples (baseline had {old_n})")
+            elif stats.get("n") and old_n:
+                checks.append((f"latency_ms.{kind}.p99", stats["p99"], old["latency_ms"][kind]["p99"], True))
+        if "rss_per_conn_kb" in result and "rss_per_conn_kb" in old:
+            checks.append(("rss_per_conn_kb", result["rss_per_conn_kb"], old["rss_per_conn_kb"], True))
+        for name, new_value, old_value, higher_is_worse in checks:
+            worse = new_value > old_value * (1 + tolerance) if higher_is_worse else new_value < old_value * (1 - tolerance)
+            if worse and old_value: regressions.append(f"{result['rooms']}x{result['players_per_room']} {name}: {old_value} -> {new_value}")
+    return regressions
+
+def git_revision() -> Optional[str]:
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", default="1,10", help="comma-separated room counts")
+    parser.add_argument("--players", default="2,8", help="comma-separated players per room")
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured per scenario")
+    parser.add_argument("--tick", type=int, default=0, help="request draw batching (ms) for bench rooms")
+    parser.add_argument("--binary", action="store_true", help="negotiate the msgpack subprotocol (needs msgpack)")
+    parser.add_argument("--url", help="benchmark an already running server (ws://host:port); skips lag and RSS")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="previous JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed regression vs baseline (fraction)")
+    args = parser.parse_args()
+
+    results = []
+    empty = False
+    for rooms in map(int, args.rooms.split(",")):
+        for players in map(int, args.players.split(",")):
+            result = await run_scenario(args, rooms, players)
+            print(f"{rooms} rooms x {players} players: {result['received_per_s']} msgs/s received, "
+                  f"draw p99 {result['latency_ms']['draw'].get('p99')} ms", file=sys.stderr)
+            results.append(result)
+            if not result["latency_ms"]["draw"].get("n"):
+                # Without draw samples the broadcast path isn't measured at all, so don't report a pass
+                print(f"ERROR {rooms}x{players}: no draw latency samples (is the server stripping \"t\"?)", file=sys.stderr)
+                empty = True
+
+    report = {
+        "meta": {
+            "revision": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "tick": args.tick, "binary": args.binary, "duration_s": args.duration, "timestamp": int(time.time())
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f: f.write(output + "\n")
+    else: print(output)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions: sys.exit(1)
+    if empty: sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import json
+from typing import Callable, Optional, Tuple, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # optional: without it every client gets JSON
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+SUBPROTOCOLS = {"skribbl.msgpack": MSGPACK, "skribbl.json": JSON}
+
+class Frame:
+    """An outgoing message, encoded at most once per wire format and shared by every recipient.
+
+    `text` may be passed pre-encoded (e.g. a redraw assembled from cached history); `build` then
+    supplies the message lazily, only if a binary client needs it.
+    """
+    __slots__ = ("type", "_message", "_build", "_text", "_binary")
+
+    def __init__(self, message: Optional[dict] = None, text: Optional[str] = None,
+                 build: Optional[Callable[[], dict]] = None, msg_type: Optional[str] = None):
+        self.type = message.get("type") if message else msg_type
+        self._message = message
+        self._build = build
+        self._text = text
+        self._binary: Optional[bytes] = None
+
+    @property
+    def message(self) -> dict:
+        if self._message is None: self._message = self._build() if self._build else json.loads(self._text)
+        return self._message
+
+    @property
+    def text(self) -> str:
+        if self._text is None: self._text = json.dumps(self._message)
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None: self._binary = msgpack.packb(self.message)
+        return self._binary
+
+def negotiate(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """Picks the first subprotocol the client offers that we support; JSON if none match."""
+    offered = websocket.headers.get("sec-websocket-protocol", "")
+    for name in (p.strip() for p in offered.split(",")):
+        protocol = SUBPROTOCOLS.get(name)
+        if protocol == MSGPACK and not msgpack: continue
+        if protocol: return protocol, name
+    return JSON, None
+
+def decode(data: Union[str, bytes]) -> dict:
+    return msgpack.unpackb(data) if isinstance(data, bytes) and msgpack else json.loads(data)
+
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """Next text or binary frame from the client; raises WebSocketDisconnect like receive_text()."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect": raise WebSocketDisconnect(message.get("code", 1000))
+    return message["text"] if message.get("text") is not None else message["bytes"]
@@ -0,0 +1,33 @@
+from typing import Set
+
+MISS, CLOSE, EXACT = 0, 1, 2
+MAX_WORD_LENGTH = 32  # longer words are matched exactly only; the neighborhood grows with len(word)**distance
+
+def deletions(word: str, depth: int) -> Set[str]:
+    """The word plus every string made by deleting up to `depth` of its characters."""
+    variants = frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants = variants | frontier
+    return variants
+
+class GuessMatcher:
+    """One round's word, precomputed when it is picked so each chat message is cheap to check.
+
+    A guess is close when it shares a deletion variant with the word (a deletion-neighborhood
+    index): that covers up to `distance` inserted, dropped or substituted letters, and swapped
+    neighbours. Guesses whose length rules that out cost one comparison.
+    """
+    __slots__ = ("word", "distance", "neighborhood")
+
+    def __init__(self, word: str, distance: int = 1):
+        self.word = word.strip().lower()
+        self.distance = distance if len(self.word) <= MAX_WORD_LENGTH else 0
+        self.neighborhood = deletions(self.word, self.distance) if self.distance else {self.word}
+
+    def match(self, guess: str) -> int:
+        if len(guess) > 2 * len(self.word) + self.distance + 8: return MISS  # before strip/lower, which are O(len)
+        guess = guess.strip().lower()
+        if guess == self.word: return EXACT
+        if not self.distance or not guess or abs(len(guess) - len(self.word)) > self.distance: return MISS
+        return MISS if self.neighborhood.isdisjoint(deletions(guess, self.distance)) else CLOSE
@@ -1,31 +1,345 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from typing import Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+from array import array
+from collections import OrderedDict, deque
 import json
 import asyncio
+import os
 import random
+import signal
+import socket
+import time
+import uuid
+from backplane import Backplane, HashRing, InProcessBackplane, RespBackplane
+from codec import JSON, MSGPACK, Frame, decode, negotiate, receive_frame
+from guess import CLOSE, EXACT, MISS, GuessMatcher
+from metrics import LoopLagMonitor, Registry, Tracer
+from ratelimit import Limiter, TokenBucket
+from timing_wheel import Timer, TimingWheel
 
 app = FastAPI()
 
 # --- CONFIGURATION ---
 ROUND_DURATION = 60
+SELECTION_TIMEOUT = 15
+HINT_TIMES = (30, 15)           # seconds left when a letter is revealed
+TIMER_RESYNC_INTERVAL = 15      # seconds between timer resyncs; clients count down locally from the deadline
+SEND_QUEUE_SIZE = 256           # frames buffered per socket before the slow-consumer policy kicks in
+SLOW_CONSUMER_POLICY = "redraw" # "drop": shed stale draw/timer frames, "redraw": collapse canvas frames into one redraw, "evict": shed nothing
+EVICT_AFTER_MS = 5000           # a full queue whose writer has not finished a send for this long is disconnected (any policy)
+FRAME_TICK_MS = 0              # default draw batching interval for new rooms; 0 sends every segment as it arrives
+FRAME_TICK_RANGE = (16, 100)    # bounds for the per-room ?tick= opt-in
+BACKPLANE_URL = os.environ.get("SKRIBBL_BACKPLANE", "")  # e.g. redis://127.0.0.1:6380; empty keeps all rooms in this process
+WORKER_ID = os.environ.get("SKRIBBL_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+HEARTBEAT_INTERVAL = 1.0        # seconds between membership heartbeats; a worker is dropped after 3 missed
+HANDOFF_GRACE = 30              # seconds a handed-off room waits for its players to reconnect
+RATE_LIMITS = {                 # per-connection token buckets by message type: (messages per second, burst)
+    "draw": (120, 240), "fill": (5, 10), "undo": (5, 10), "clear": (2, 5),
+    "chat": (2, 5), "word_select": (2, 5), "other": (5, 10)
+}                               # over budget, draw/fill are coalesced into batches, chat is debounced, the rest dropped
+CONNECTION_RATE_LIMIT = (200, 400)  # frames per second per socket, any type; over it we stop reading and TCP pushes back
+CLOSE_GUESS_DISTANCE = 1        # edits away from the word that get a private "is close!"; 0 disables
+LOOP_LAG_INTERVAL = 0.5         # seconds between event-loop lag probes
+TRACE_SAMPLE_RATE = float(os.environ.get("SKRIBBL_TRACE_SAMPLE", "0"))  # share of messages traced by room and type; 0 disables
+METRICS_TOP_ROOMS = 50          # per-room series on /metrics are limited to the rooms with the most history
+CANVAS_TYPES = {"draw", "fill", "draw_batch", "undo_stroke", "clear", "redraw"}
+MESSAGE_TYPES = {"word_select", "draw", "fill", "clear", "undo", "chat"}
+
+# --- METRICS ---
+registry = Registry()
+MESSAGE_SECONDS = registry.histogram("skribbl_message_handle_seconds", "Time spent handling one client message, by type.", ("type",))
+MESSAGE_ERRORS = registry.counter("skribbl_message_errors_total", "Client messages that raised while being handled, by type.", ("type",))
+FANOUT_SECONDS = registry.histogram("skribbl_fanout_seconds", "Time to encode one broadcast and enqueue it for every socket in the room.")
+FANOUT_FRAMES = registry.counter("skribbl_fanout_frames_total", "Frames enqueued to sockets by broadcasts.")
+SEND_FAILURES = registry.counter("skribbl_send_failures_total", "Socket writes that raised; the socket is evicted.")
+EVICTIONS = registry.counter("skribbl_evictions_total", "Sockets disconnected by the send queue, by reason.", ("reason",))
+SHED_FRAMES = registry.counter("skribbl_shed_frames_total", "Queued frames dropped by the slow-consumer policy.")
+RATE_LIMITED = registry.counter("skribbl_rate_limited_total", "Messages over their type's budget, by type and what was done with them.", ("type", "action"))
+THROTTLED_READS = registry.counter("skribbl_throttled_reads_total", "Socket reads delayed because the connection was over its budget.")
+ROUND_TRANSITIONS = registry.counter("skribbl_round_transitions_total", "Round state changes, by the state entered.", ("state",))
+LOOP_LAG = registry.histogram("skribbl_event_loop_lag_seconds", "How late the event loop ran a timed wake-up.",
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_LAG_LAST = registry.gauge("skribbl_event_loop_lag_last_seconds", "Event-loop lag at the most recent probe.")
+registry.gauge("skribbl_active_rooms", "Rooms hosted by this worker.", collect=lambda: {(): len(manager.rooms)})
+registry.gauge("skribbl_active_players", "Players connected to rooms hosted by this worker.",
+               collect=lambda: {(): sum(len(room.players) for room in manager.rooms.values())})
+registry.gauge("skribbl_relayed_connections", "Sockets on this worker relayed to rooms hosted elsewhere.", collect=lambda: {(): cluster.relayed})
+registry.gauge("skribbl_room_history_strokes", "Strokes in a room's draw history.", ("room",),
+               collect=lambda: {(room.room_id,): len(room.history) for room in largest_rooms()})
+registry.gauge("skribbl_room_history_segments", "Draw segments merged into a room's history.", ("room",),
+               collect=lambda: {(room.room_id,): room.history.segments for room in largest_rooms()})
+tracer = Tracer(TRACE_SAMPLE_RATE)
+lag_monitor = LoopLagMonitor(LOOP_LAG, LOOP_LAG_LAST, LOOP_LAG_INTERVAL)
+
+def largest_rooms() -> List["Room"]:
+    return sorted(manager.rooms.values(), key=lambda room: room.history.segments, reverse=True)[:METRICS_TOP_ROOMS]
+
+def merge_frame(ops: List[dict], f: dict):
+    """Appends a draw/fill frame to ops, extending the last polyline when the segment continues it."""
+    last = ops[-1] if ops else None
+    if f.get("type") != "draw":
+        ops.append(f)
+    elif (last and last["type"] == "stroke" and last["strokeId"] == f.get("strokeId") and last["color"] == f.get("color")
+            and last["points"][-2:] == [f.get("prevX"), f.get("prevY")]):
+        last["points"] += [f.get("currX"), f.get("currY")]
+    else:
+        ops.append({
+            "type": "stroke", "strokeId": f.get("strokeId"), "color": f.get("color"),
+            "points": [f.get("prevX"), f.get("prevY"), f.get("currX"), f.get("currY")]
+        })
+
+def merge_frames(frames: List[dict]) -> List[dict]:
+    """Collapses contiguous draw segments of the same stroke into one polyline op; fills pass through."""
+    ops: List[dict] = []
+    for f in frames: merge_frame(ops, f)
+    return ops
+
+POLYLINE, FILL = 0, 1
+
+class Stroke:
+    """One stroke's ops as columns: (kind, color id, start) triples, with each op's points stored in one
+    flat float64 coordinate array (a fill is a single x, y). ~24 bytes per segment instead of a dict."""
+    __slots__ = ("ops", "coords", "segments", "encoded")
+
+    def __init__(self):
+        self.ops = array("I")
+        self.coords = array("d")
+        self.segments = 0
+        self.encoded: Optional[str] = None  # JSON of the stroke's ops, cached once it is finished
+
+    def add(self, kind: int, color: int, coords):
+        start = len(self.coords)
+        self.coords.extend(coords)
+        self.ops.extend((kind, color, start))
+
+    def extend(self, color: int, x0: float, y0: float, x1: float, y1: float):
+        """Continues the last polyline if the segment starts where it ended, otherwise starts a new op."""
+        ops, coords = self.ops, self.coords
+        if ops and ops[-3] == POLYLINE and ops[-2] == color and coords[-2] == x0 and coords[-1] == y0:
+            coords.append(x1)
+            coords.append(y1)
+        else:
+            self.add(POLYLINE, color, (x0, y0, x1, y1))
+
+class DrawHistory:
+    """Canvas ops indexed by stroke, stored column-wise with an interned color table. Each stroke is
+    kept compacted as polylines, so undo pops one stroke and a joiner's snapshot holds a few ops per
+    stroke instead of every segment drawn. Ops stream back out as the dicts clients already handle."""
+    def __init__(self):
+        self.strokes: "OrderedDict[str, Stroke]" = OrderedDict()
+        self.colors: List[str] = []
+        self.color_ids: Dict[str, int] = {}
+        self.segments = 0
+        self.anonymous = 0
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def color_id(self, color: str) -> int:
+        idx = self.color_ids.get(color)
+        if idx is None:
+            idx = self.color_ids[color] = len(self.colors)
+            self.colors.append(color)
+        return idx
+
+    def stroke(self, stroke_id) -> Stroke:
+        if not stroke_id:
+            # Frames without a strokeId are undone one at a time
+            self.anonymous += 1
+            stroke_id = f"~{self.anonymous}"
+        stroke_id = str(stroke_id)
+        stroke = self.strokes.get(stroke_id)
+        if stroke is None: stroke = self.strokes[stroke_id] = Stroke()
+        else:
+            self.strokes.move_to_end(stroke_id)
+            stroke.encoded = None
+        return stroke
+
+    def append(self, frame: dict):
+        """Raises ValueError/TypeError on a frame with bad coordinates, before anything is stored."""
+        draw = frame.get("type") == "draw"
+        coords = [float(frame.get(k)) for k in (("prevX", "prevY", "currX", "currY") if draw else ("x", "y"))]
+        color = self.color_id(frame.get("color"))
+        stroke = self.stroke(frame.get("strokeId"))
+        if draw: stroke.extend(color, *coords)
+        else: stroke.add(FILL, color, coords)
+        stroke.segments += 1
+        self.segments += 1
+
+    def undo(self) -> Optional[str]:
+        """Drops the most recent stroke and returns its id (prefixed with ~ if the client sent none)."""
+        if not self.strokes: return None
+        stroke_id, stroke = self.strokes.popitem()
+        self.segments -= stroke.segments
+        return stroke_id
+
+    def clear(self):
+        self.strokes.clear()
+        self.colors.clear()
+        self.color_ids.clear()
+        self.segments = 0
+
+    def ops(self, stroke_id: str, stroke: Stroke) -> List[dict]:
+        client_id = None if stroke_id.startswith("~") else stroke_id
+        ops, meta, coords = [], stroke.ops, stroke.coords
+        for i in range(0, len(meta), 3):
+            kind, color, start = meta[i], meta[i + 1], meta[i + 2]
+            end = meta[i + 5] if i + 3 < len(meta) else len(coords)
+            if kind == POLYLINE:
+                ops.append({"type": "stroke", "strokeId": client_id, "color": self.colors[color], "points": coords[start:end].tolist()})
+            else:
+                ops.append({"type": "fill", "x": coords[start], "y": coords[start + 1], "color": self.colors[color], "strokeId": client_id})
+        return ops
+
+    def snapshot(self) -> List[dict]:
+        return [op for stroke_id, stroke in self.strokes.items() for op in self.ops(stroke_id, stroke)]
+
+    def redraw_frame(self) -> Frame:
+        """A redraw message assembled from cached per-stroke JSON; only the last stroke is encoded."""
+        last = next(reversed(self.strokes), None)
+        parts = []
+        for stroke_id, stroke in self.strokes.items():
+            part = stroke.encoded
+            if part is None:
+                part = ", ".join(json.dumps(op) for op in self.ops(stroke_id, stroke))
+                if stroke_id != last: stroke.encoded = part
+            parts.append(part)
+        text = '{"type": "redraw", "history": [' + ", ".join(parts) + ']}'
+        return Frame(text=text, build=lambda: {"type": "redraw", "history": self.snapshot()}, msg_type="redraw")
+
+    def load(self, ops: List[dict]):
+        """Rebuilds the store from a snapshot (room handoff between workers)."""
+        for op in ops:
+            stroke = self.stroke(op.get("strokeId"))
+            color = self.color_id(op.get("color"))
+            if op.get("type") == "stroke":
+                stroke.add(POLYLINE, color, op["points"])
+                segments = max(1, len(op["points"]) // 2 - 1)
+            else:
+                stroke.add(FILL, color, (op.get("x"), op.get("y")))
+                segments = 1
+            stroke.segments += segments
+            self.segments += segments
+
+PENDING_REDRAW = Frame(msg_type="redraw")  # queue placeholder for a canvas snapshot taken at send time
+
+class OutboundQueue:
+    """Bounded per-socket send buffer drained by its own writer task, so a slow client only delays itself."""
+    def __init__(self, websocket: WebSocket, on_evict: Callable[[WebSocket], None],
+                 snapshot: Optional[Callable[[], Frame]], protocol: str = JSON):
+        self.websocket = websocket
+        self.on_evict = on_evict
+        self.snapshot = snapshot  # returns a redraw of the current canvas
+        self.binary = protocol == MSGPACK
+        self.frames: Deque[Frame] = deque()
+        self.ready = asyncio.Event()
+        self.progress = time.monotonic()  # last time the writer finished a send, or frames arrived while it was idle
+        self.sending = False
+        self.closed = False
+        self.task = asyncio.create_task(self.writer())
+
+    def put(self, frame: Frame):
+        if self.closed: return
+        if not self.frames and not self.sending: self.progress = time.monotonic()
+        elif len(self.frames) >= SEND_QUEUE_SIZE:
+            # Judged by the writer, not the queue length: shedding keeps the queue short even if no send ever completes
+            stalled = time.monotonic() - self.progress > EVICT_AFTER_MS / 1000
+            if stalled or len(self.frames) >= 2 * SEND_QUEUE_SIZE: return self.evict("backlog")
+            if self.shed(frame.type): return
+        self.frames.append(frame)
+        self.ready.set()
+
+    def shed(self, incoming: str) -> bool:
+        """Applies the slow-consumer policy to a full queue. Returns True if the incoming frame is covered."""
+        if SLOW_CONSUMER_POLICY == "evict": return False
+        collapse = SLOW_CONSUMER_POLICY == "redraw" and self.snapshot
+        stale = {"timer"} | CANVAS_TYPES if collapse else {"timer", "draw", "draw_batch"}
+        queued = len(self.frames)
+        self.frames = deque(f for f in self.frames if f.type not in stale)
+        SHED_FRAMES.inc(queued - len(self.frames))
+        if collapse:
+            # History is updated before every canvas broadcast, so one snapshot replaces all dropped canvas frames.
+            # It is built when the writer gets to it, so repeated overflows don't each encode the canvas.
+            self.frames.append(PENDING_REDRAW)
+            return incoming in CANVAS_TYPES
+        return False
+
+    async def writer(self):
+        try:
+            while True:
+                if not self.frames:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                frame = self.frames.popleft()
+                if frame is PENDING_REDRAW: frame = self.snapshot()
+                self.sending = True
+                if self.binary: await self.websocket.send_bytes(frame.binary)
+                else: await self.websocket.send_text(frame.text)
+                self.sending = False
+                self.progress = time.monotonic()
+        except asyncio.CancelledError: pass
+        except Exception:
+            SEND_FAILURES.inc()
+            self.evict("error")
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        self.frames.clear()
+        self.task.cancel()
+
+    def evict(self, reason: str):
+        if self.closed: return
+        EVICTIONS.labels(reason).inc()
+        self.close()
+        self.on_evict(self.websocket)
+        asyncio.create_task(self.close_socket())
+
+    async def close_socket(self):
+        try: await self.websocket.close()
+        except: pass
+
+class Player:
+    __slots__ = ("websocket", "name", "score", "queue", "limiter", "pending_chat", "chat_handle")
+
+    def __init__(self, websocket: WebSocket, name: str, score: int, queue: OutboundQueue):
+        self.websocket = websocket
+        self.name = name
+        self.score = score
+        self.queue = queue
+        self.limiter = Limiter(RATE_LIMITS)
+        self.pending_chat: Optional[str] = None  # newest message of a debounced chat burst
+        self.chat_handle: Optional[asyncio.TimerHandle] = None
 
 class Room:
-    def __init__(self, room_id: str):
+    def __init__(self, room_id: str, frame_tick_ms: int = FRAME_TICK_MS):
         self.room_id = room_id
-        self.active_connections: List[WebSocket] = []
+        self.players: Dict[WebSocket, Player] = {}  # by connection, in join order
         self.drawer: Optional[WebSocket] = None
         self.word: str = ""
         self.word_hint: str = ""
-        self.scores: Dict[WebSocket, int] = {}
-        self.names: Dict[WebSocket, str] = {}
-        self.game_task: Optional[asyncio.Task] = None
-        self.guessed_count = 0
-        self.turn_queue: List[WebSocket] = [] 
-        self.draw_history: List[dict] = [] 
+        self.matcher: Optional[GuessMatcher] = None  # set while a round is being drawn
+        self.timers: Dict[str, Timer] = {}  # pending room events on the shared timing wheel, by event name
+        self.deadline: Optional[float] = None  # wall-clock end of the current round
+        self.restored_scores: Dict[str, int] = {}  # by name, from a handoff, claimed as players reconnect
+        self.restored_drawer: Optional[str] = None
+        self.restored_guessed: Set[str] = set()  # names that already found the word before a handoff
+        self.leaderboard: Optional[List[dict]] = None  # cached until a score or the player list changes
+        self.word_choices: List[str] = []  # offered to the drawer; word_select must pick one of these
+        self.guessed: Set[WebSocket] = set()  # players who found this round's word
+        self.turn_queue: Deque[Player] = deque()  # players who left are skipped when their turn comes up
+        self.history = DrawHistory()
+        self.frame_tick_ms = frame_tick_ms
+        self.pending_frames: List[dict] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[TimingWheel] = None):
         self.rooms: Dict[str, Room] = {}
+        self.scheduler = scheduler if scheduler is not None else TimingWheel()
+        self.room_closed: Optional[Callable[[str], None]] = None
         self.word_list = [
             "apple", "banana", "cherry", "date", "elderberry", "fig", "grape", 
             "house", "sun", "robot", "computer", "python", "guitar", "ocean", 
@@ -37,16 +351,29 @@ class ConnectionManager:
             "christmas", "santa", "elf", "reindeer", "snowflake", "snowman"
         ]
 
-    async def connect(self, websocket: WebSocket, room_id: str, name: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, room_id: str, name: str, frame_tick_ms: int = 0):
+        protocol, subprotocol = negotiate(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         if room_id not in self.rooms:
-            self.rooms[room_id] = Room(room_id)
+            if frame_tick_ms: frame_tick_ms = min(max(frame_tick_ms, FRAME_TICK_RANGE[0]), FRAME_TICK_RANGE[1])
+            self.rooms[room_id] = Room(room_id, frame_tick_ms or FRAME_TICK_MS)
             print(f"Created Room: {room_id}")
 
         room = self.rooms[room_id]
-        room.active_connections.append(websocket)
-        room.names[websocket] = name
-        if websocket not in room.scores: room.scores[websocket] = 0
+        self.cancel_timers(room, "handoff_expiry")
+        queue = OutboundQueue(
+            websocket,
+            lambda ws: self.disconnect(ws, room_id),
+            room.history.redraw_frame,
+            protocol
+        )
+        room.players[websocket] = Player(websocket, name, room.restored_scores.pop(name, 0), queue)
+        room.leaderboard = None
+        if room.restored_drawer == name:
+            room.drawer, room.restored_drawer = websocket, None
+        if name in room.restored_guessed:
+            room.restored_guessed.discard(name)
+            room.guessed.add(websocket)
 
         current_role = "guesser"
         if room.drawer == websocket: current_role = "drawer"
@@ -54,142 +381,223 @@ class ConnectionManager:
         display_word = room.word_hint
         if current_role == "drawer": display_word = room.word
 
-        await websocket.send_text(json.dumps({
+        self.send(room, websocket, {
             "type": "game_state",
             "role": current_role,
             "word": display_word,
-            "scores": self.get_leaderboard(room)
-        }))
+            "scores": self.get_leaderboard(room),
+            "time": self.seconds_left(room),
+            "deadline": int(room.deadline * 1000) if room.deadline else None
+        })
         
-        if room.draw_history:
-             await websocket.send_text(json.dumps({
-                "type": "redraw",
-                "history": room.draw_history
-            }))
+        if room.history:
+             self.send(room, websocket, room.history.redraw_frame())
 
-        if len(room.active_connections) >= 2 and not room.game_task and not room.drawer:
+        if len(room.players) >= 2 and not room.timers and not room.drawer:
             await self.start_round_selection(room_id)
 
     def disconnect(self, websocket: WebSocket, room_id: str):
         if room_id in self.rooms:
             room = self.rooms[room_id]
-            if websocket in room.active_connections: room.active_connections.remove(websocket)
-            if websocket in room.names: del room.names[websocket]
-            if websocket in room.scores: del room.scores[websocket]
-            if websocket in room.turn_queue: room.turn_queue.remove(websocket)
+            player = room.players.pop(websocket, None)
+            if player:
+                player.queue.close()
+                if player.chat_handle: player.chat_handle.cancel()
+                room.leaderboard = None
             
             if room.drawer == websocket:
                 room.drawer = None
-                if room.game_task: room.game_task.cancel()
-                if len(room.active_connections) >= 2:
+                self.cancel_timers(room)
+                if len(room.players) >= 2:
                     asyncio.create_task(self.start_round_selection(room_id))
             
-            if not room.active_connections:
-                if room.game_task: room.game_task.cancel()
+            if not room.players:
+                self.cancel_timers(room)
+                if room.flush_handle: room.flush_handle.cancel()
                 del self.rooms[room_id]
+                if self.room_closed: self.room_closed(room_id)
+
+    def export_room(self, room: Room) -> dict:
+        """Serializable room state for handing a room to another worker."""
+        return {
+            "tick": room.frame_tick_ms, "word": room.word, "hint": room.word_hint,
+            "drawer": room.players[room.drawer].name if room.drawer in room.players else None,
+            "time_left": room.deadline - time.time() if room.deadline else None,
+            "scores": {player.name: player.score for player in room.players.values()},
+            "guessed": [room.players[sock].name for sock in room.guessed if sock in room.players],
+            "history": room.history.snapshot()
+        }
+
+    def import_room(self, room_id: str, state: dict):
+        room = self.rooms[room_id] = Room(room_id, state["tick"])
+        room.history.load(state["history"])
+        room.restored_scores = state["scores"]
+        time_left = state["time_left"]
+        if time_left and state["drawer"]:
+            # Resume the round in progress; the drawer gets their role back when they reconnect
+            room.word, room.word_hint, room.restored_drawer = state["word"], state["hint"], state["drawer"]
+            room.restored_guessed = set(state.get("guessed", ()))  # absent from workers on an older version
+            room.matcher = GuessMatcher(room.word, CLOSE_GUESS_DISTANCE)
+            room.deadline = time.time() + time_left
+            for seconds_left in HINT_TIMES:
+                if time_left > seconds_left: self.schedule(room, f"hint_{seconds_left}", time_left - seconds_left, self.reveal_hint, room)
+            self.schedule(room, "round_end", time_left, self.end_round, room_id)
+        self.schedule(room, "handoff_expiry", HANDOFF_GRACE, self.expire_room, room_id)
+        print(f"Restored Room: {room_id}")
+
+    def expire_room(self, room_id: str):
+        room = self.rooms.get(room_id)
+        if room and not room.players:
+            self.cancel_timers(room)
+            del self.rooms[room_id]
+            if self.room_closed: self.room_closed(room_id)
 
     def get_leaderboard(self, room: Room):
-        leaderboard = []
-        for sock, score in room.scores.items():
-            if sock in room.names:
-                leaderboard.append({"name": room.names[sock], "score": score})
-        return sorted(leaderboard, key=lambda x: x['score'], reverse=True)
-
-    async def broadcast(self, message: dict, room_id: str):
+        if room.leaderboard is None:
+            leaderboard = [{"name": player.name, "score": player.score} for player in room.players.values()]
+            room.leaderboard = sorted(leaderboard, key=lambda x: x['score'], reverse=True)
+        return room.leaderboard
+
+    def send(self, room: Room, websocket: WebSocket, message: Union[dict, Frame]):
+        player = room.players.get(websocket)
+        if player: player.queue.put(message if isinstance(message, Frame) else Frame(message))
+
+    def fanout(self, room: Room, message: Union[dict, Frame]):
+        # Encode once, enqueue only: cost is independent of how fast each client drains its queue
+        if room.pending_frames: self.flush_frames(room)  # keep batched strokes ordered before clears, rounds, etc.
+        start = time.perf_counter()
+        frame = message if isinstance(message, Frame) else Frame(message)
+        for player in list(room.players.values()):
+            player.queue.put(frame)
+        FANOUT_SECONDS.observe(time.perf_counter() - start)
+        FANOUT_FRAMES.inc(len(room.players))
+
+    def queue_frame(self, room: Room, frame: dict, delay: Optional[float] = None):
+        room.pending_frames.append(frame)
+        if not room.flush_handle:
+            if delay is None: delay = room.frame_tick_ms / 1000
+            room.flush_handle = asyncio.get_running_loop().call_later(delay, self.flush_frames, room)
+
+    def flush_frames(self, room: Room):
+        if room.flush_handle:
+            room.flush_handle.cancel()
+            room.flush_handle = None
+        frames, room.pending_frames = room.pending_frames, []
+        if not frames: return
+        span = tracer.start() if tracer.enabled else None
+        batch = {"type": "draw_batch", "ops": merge_frames(frames)}
+        # Pass through the oldest sender timestamp, as unbatched draws carry theirs, so batching delay is measurable
+        if "t" in frames[0]: batch["t"] = frames[0]["t"]
+        self.fanout(room, batch)
+        if span: tracer.finish(span, room.room_id, "draw_batch")
+
+    async def broadcast(self, message: Union[dict, Frame], room_id: str):
         if room_id in self.rooms:
-            room = self.rooms[room_id]
-            json_msg = json.dumps(message)
-            for connection in room.active_connections[:]:
-                try: await connection.send_text(json_msg)
-                except: self.disconnect(connection, room_id)
+            self.fanout(self.rooms[room_id], message)
+
+    def schedule(self, room: Room, event: str, delay: float, callback: Callable, *args):
+        """(Re)schedules a named room event on the shared wheel; at most one of each name is pending."""
+        self.cancel_timers(room, event)
+        def fire():
+            room.timers.pop(event, None)
+            return callback(*args)
+        room.timers[event] = self.scheduler.schedule(delay, fire)
+
+    def cancel_timers(self, room: Room, *events: str):
+        for event in events or list(room.timers):
+            self.scheduler.cancel(room.timers.pop(event, None))
+
+    def seconds_left(self, room: Room) -> int:
+        return max(0, round(room.deadline - time.time())) if room.deadline else 0
 
     async def start_round_selection(self, room_id: str):
         room = self.rooms.get(room_id)
-        if not room or len(room.active_connections) < 2: return
-        if room.game_task: room.game_task.cancel()
+        if not room or len(room.players) < 2: return
+        self.cancel_timers(room)
+        room.deadline = None
+        room.matcher = None
 
-        room.draw_history = [] 
+        room.history.clear()
 
         if not room.turn_queue:
-            room.turn_queue = [p for p in room.active_connections]
-            random.shuffle(room.turn_queue)
+            order = list(room.players.values())
+            random.shuffle(order)
+            room.turn_queue = deque(order)
 
         room.drawer = None
         while room.turn_queue:
-            candidate = room.turn_queue.pop(0)
-            if candidate in room.active_connections:
-                room.drawer = candidate
+            candidate = room.turn_queue.popleft()
+            if room.players.get(candidate.websocket) is candidate:
+                room.drawer = candidate.websocket
                 break
         
         if not room.drawer:
-            if room.active_connections: await self.start_round_selection(room_id)
+            if room.players: await self.start_round_selection(room_id)
             return
 
-        word_choices = random.sample(self.word_list, 3)
-        drawer_name = room.names[room.drawer]
+        word_choices = room.word_choices = random.sample(self.word_list, 3)
+        drawer_name = room.players[room.drawer].name
 
-        try:
-            await room.drawer.send_text(json.dumps({
-                "type": "choose_word", "words": word_choices, "drawer_name": drawer_name
-            }))
-        except:
-            self.disconnect(room.drawer, room_id)
-            await self.start_round_selection(room_id)
-            return
+        # A drawer whose socket dies is evicted by its writer, and disconnect() picks the next drawer
+        self.send(room, room.drawer, {
+            "type": "choose_word", "words": word_choices, "drawer_name": drawer_name
+        })
 
-        for sock in room.active_connections:
-            if sock != room.drawer:
-                await sock.send_text(json.dumps({
-                    "type": "choosing", "message": f"{drawer_name} is choosing a word...", "drawer_name": drawer_name
-                }))
+        choosing = Frame({"type": "choosing", "message": f"{drawer_name} is choosing a word...", "drawer_name": drawer_name})
+        for player in list(room.players.values()):
+            if player.websocket != room.drawer: player.queue.put(choosing)
 
-        room.game_task = asyncio.create_task(self.selection_timeout(room_id, word_choices[0]))
-
-    async def selection_timeout(self, room_id: str, default_word: str):
-        try:
-            await asyncio.sleep(15)
-            await self.start_actual_game(room_id, default_word)
-        except asyncio.CancelledError: pass
+        self.schedule(room, "selection", SELECTION_TIMEOUT, self.start_actual_game, room_id, word_choices[0])
+        ROUND_TRANSITIONS.labels("choosing").inc()
 
     async def start_actual_game(self, room_id: str, selected_word: str):
         room = self.rooms.get(room_id)
-        if not room: return
-        if room.game_task: room.game_task.cancel()
+        if not room or not room.drawer: return
+        self.cancel_timers(room)
 
         room.word = selected_word
         room.word_hint = "_ " * len(room.word)
-        room.guessed_count = 0
-        drawer_name = room.names[room.drawer]
-
+        room.matcher = GuessMatcher(room.word, CLOSE_GUESS_DISTANCE)
+        room.word_choices = []
+        room.guessed.clear()
+        room.restored_guessed.clear()
+        drawer_name = room.players[room.drawer].name
+        room.deadline = time.time() + ROUND_DURATION
+        deadline_ms = int(room.deadline * 1000)
+
+        # Clients get the deadline once and count down locally; see resync_timer for drift correction
         await self.broadcast({
-            "type": "new_round", "role": "guesser", "word": room.word_hint, "drawer_name": drawer_name, "round_time": ROUND_DURATION
+            "type": "new_round", "role": "guesser", "word": room.word_hint, "drawer_name": drawer_name,
+            "round_time": ROUND_DURATION, "deadline": deadline_ms
         }, room_id)
 
-        try:
-            await room.drawer.send_text(json.dumps({
-                "type": "new_round", "role": "drawer", "word": room.word, "drawer_name": drawer_name, "round_time": ROUND_DURATION
-            }))
-        except:
-            self.disconnect(room.drawer, room_id)
-            await self.start_round_selection(room_id)
-            return
+        self.send(room, room.drawer, {
+            "type": "new_round", "role": "drawer", "word": room.word, "drawer_name": drawer_name,
+            "round_time": ROUND_DURATION, "deadline": deadline_ms
+        })
+
+        for seconds_left in HINT_TIMES:
+            self.schedule(room, f"hint_{seconds_left}", ROUND_DURATION - seconds_left, self.reveal_hint, room)
+        self.schedule(room, "resync", TIMER_RESYNC_INTERVAL, self.resync_timer, room)
+        self.schedule(room, "round_end", ROUND_DURATION, self.end_round, room_id)
+        ROUND_TRANSITIONS.labels("drawing").inc()
 
-        room.game_task = asyncio.create_task(self.game_timer(room_id))
+    def resync_timer(self, room: Room):
+        if not room.deadline: return
+        self.fanout(room, {"type": "timer", "time": self.seconds_left(room), "deadline": int(room.deadline * 1000)})
+        if room.deadline - time.time() > TIMER_RESYNC_INTERVAL:
+            self.schedule(room, "resync", TIMER_RESYNC_INTERVAL, self.resync_timer, room)
 
-    async def game_timer(self, room_id: str):
+    async def end_round(self, room_id: str):
         room = self.rooms.get(room_id)
         if not room: return
-        try:
-            for seconds_left in range(ROUND_DURATION, -1, -1):
-                await self.broadcast({"type": "timer", "time": seconds_left}, room_id)
-                if seconds_left in [30, 15]: await self.reveal_hint(room)
-                if seconds_left == 0:
-                    await self.broadcast({"type": "chat", "message": f"⏰ Time's up! Word: {room.word.upper()}", "isSystem": True}, room_id)
-                    await asyncio.sleep(3)
-                    await self.start_round_selection(room_id)
-                    return
-                await asyncio.sleep(1)
-        except asyncio.CancelledError: pass 
+        room.deadline = None
+        room.matcher = None
+        self.cancel_timers(room, "resync")
+        ROUND_TRANSITIONS.labels("time_up").inc()
+        await self.broadcast({"type": "timer", "time": 0}, room_id)
+        await self.broadcast({"type": "chat", "message": f"⏰ Time's up! Word: {room.word.upper()}", "isSystem": True}, room_id)
+        self.schedule(room, "next_round", 3, self.start_round_selection, room_id)
 
     async def reveal_hint(self, room: Room):
         real = list(room.word)
@@ -201,70 +609,334 @@ class ConnectionManager:
             room.word_hint = " ".join(current)
             await self.broadcast({"type": "hint_update", "word": room.word_hint}, room.room_id)
 
-    async def handle_message(self, websocket: WebSocket, data: str, room_id: str):
+    async def handle_message(self, websocket: WebSocket, data: Union[str, bytes], room_id: str):
         room = self.rooms.get(room_id)
-        if not room: return
+        player = room.players.get(websocket) if room else None
+        if not player: return
+        kind = "invalid"
+        start = time.perf_counter()
+        span = tracer.start() if tracer.enabled else None
         try:
-            msg_data = json.loads(data)
+            msg_data = decode(data)
+            # Only known strings become metric labels and bucket keys; {"type": [1]} would not even hash
+            t = msg_data.get("type")
+            kind = t if isinstance(t, str) and t in MESSAGE_TYPES else "other"
+            if kind not in ("draw", "fill", "chat") and not player.limiter.allow(kind):
+                RATE_LIMITED.labels(kind, "dropped").inc()
+                return
             
-            if msg_data.get("type") == "word_select":
+            if kind == "word_select":
                 if websocket == room.drawer:
                     word = msg_data.get("word")
-                    if word: await self.start_actual_game(room_id, word)
+                    if word in room.word_choices: await self.start_actual_game(room_id, word)
 
-            elif msg_data.get("type") in ["draw", "fill"]:
+            elif kind in ("draw", "fill"):
                 if websocket == room.drawer: 
-                    room.draw_history.append(msg_data)
-                    await self.broadcast(msg_data, room_id)
+                    room.history.append(msg_data)
+                    if room.frame_tick_ms: self.queue_frame(room, msg_data)
+                    elif player.limiter.allow(kind): await self.broadcast(msg_data, room_id)
+                    else:
+                        # Over budget: hold segments back and send them merged once the budget refills
+                        RATE_LIMITED.labels(kind, "coalesced").inc()
+                        self.queue_frame(room, msg_data, player.limiter.wait(kind))
 
-            elif msg_data.get("type") == "clear":
+            elif kind == "clear":
                  if websocket == room.drawer:
-                    room.draw_history = []
+                    room.history.clear()
                     await self.broadcast(msg_data, room_id)
             
             # --- SMART UNDO LOGIC ---
-            elif msg_data.get("type") == "undo":
-                if websocket == room.drawer and room.draw_history:
-                    # Find the last stroke ID
-                    last_action = room.draw_history[-1]
-                    last_stroke_id = last_action.get("strokeId")
-                    
-                    if last_stroke_id:
-                        # Remove ALL items with this stroke ID (The whole line)
-                        room.draw_history = [x for x in room.draw_history if x.get("strokeId") != last_stroke_id]
+            elif kind == "undo":
+                if websocket == room.drawer and room.history:
+                    # Remove the whole last line and tell clients which one, instead of resending the canvas
+                    last_stroke_id = room.history.undo()
+                    if last_stroke_id.startswith("~"):
+                        # Fallback for old data without stroke IDs
+                        await self.broadcast(room.history.redraw_frame(), room_id)
                     else:
-                        # Fallback for old data: just pop one
-                        room.draw_history.pop()
-                        
-                    await self.broadcast({"type": "redraw", "history": room.draw_history}, room_id)
+                        await self.broadcast({"type": "undo_stroke", "strokeId": last_stroke_id}, room_id)
             
-            elif msg_data.get("type") == "chat":
+            elif kind == "chat":
                 if websocket == room.drawer: return 
-                guess = msg_data["message"].strip().lower()
-                name = room.names[websocket]
-
-                if guess == room.word:
-                    room.scores[websocket] += 100
-                    room.guessed_count += 1
-                    await self.broadcast({"type": "correct_guess", "message": f"🎉 {name} guessed the word!", "scores": self.get_leaderboard(room)}, room_id)
-                    if room.guessed_count >= len(room.active_connections) - 1:
-                        await self.broadcast({"type": "chat", "message": "Everyone guessed it!", "isSystem": True}, room_id)
-                        if room.game_task: room.game_task.cancel()
-                        await asyncio.sleep(2)
-                        await self.start_round_selection(room_id)
-                else:
-                    await self.broadcast({"type": "chat", "message": f"{name}: {msg_data['message']}"}, room_id)
-
-        except Exception as e: print(f"Error: {e}")
+                self.chat(room, player, msg_data["message"])
+
+        except Exception as e:
+            MESSAGE_ERRORS.labels(kind).inc()
+            print(f"Error handling {kind} message in room {room_id}: {e!r}")
+        finally:
+            MESSAGE_SECONDS.labels(kind).observe(time.perf_counter() - start)
+            if span: tracer.finish(span, room_id, kind)
+
+    def chat(self, room: Room, player: Player, message: str):
+        """Every message is checked against the word, so a correct guess scores even mid-burst;
+        only the chat line itself is rate limited, by debouncing a burst to its newest line."""
+        result = room.matcher.match(message) if room.matcher else MISS
+        if result == EXACT: return self.correct_guess(room, player)
+        if not player.limiter.allow("chat"): return self.debounce_chat(room, player, message)
+        self.fanout(room, {"type": "chat", "message": f"{player.name}: {message}"})
+        if result == CLOSE: self.send(room, player.websocket, {"type": "chat", "message": f"'{message.strip()}' is close!", "isSystem": True})
+
+    def correct_guess(self, room: Room, player: Player):
+        if player.websocket in room.guessed: return  # scores once per round; repeats aren't echoed either
+        room.guessed.add(player.websocket)
+        player.score += 100
+        room.leaderboard = None
+        self.fanout(room, {"type": "correct_guess", "message": f"🎉 {player.name} guessed the word!", "scores": self.get_leaderboard(room)})
+        if sum(1 for sock in room.guessed if sock in room.players) >= len(room.players) - 1:
+            self.fanout(room, {"type": "chat", "message": "Everyone guessed it!", "isSystem": True})
+            self.cancel_timers(room)
+            room.deadline = None
+            room.matcher = None
+            ROUND_TRANSITIONS.labels("all_guessed").inc()
+            self.schedule(room, "next_round", 2, self.start_round_selection, room.room_id)
+
+    def debounce_chat(self, room: Room, player: Player, message: str):
+        """Over budget: keeps only the newest line of a burst and sends it once the budget refills."""
+        RATE_LIMITED.labels("chat", "debounced").inc()
+        player.pending_chat = message
+        if not player.chat_handle:
+            player.chat_handle = asyncio.get_running_loop().call_later(player.limiter.wait("chat"), self.flush_chat, room.room_id, player)
+
+    def flush_chat(self, room_id: str, player: Player):
+        player.chat_handle = None
+        room = self.rooms.get(room_id)
+        if not room or room.players.get(player.websocket) is not player: return
+        message, player.pending_chat = player.pending_chat, None
+        if player.websocket != room.drawer: self.chat(room, player, message)
+
+class RemoteSocket:
+    """Stands in for a WebSocket held by another worker; frames are relayed over the backplane."""
+    def __init__(self, backplane: Backplane, conn_id: str):
+        self.backplane = backplane
+        self.conn_id = conn_id
+
+    headers: Dict[str, str] = {}  # relayed clients are accepted as JSON by the edge worker
+
+    async def accept(self, subprotocol: Optional[str] = None): pass
+
+    async def send_text(self, data: str):
+        await self.backplane.publish(f"conn:{self.conn_id}", "d" + data)
+
+    async def close(self, code: int = 1000):
+        await self.backplane.publish(f"conn:{self.conn_id}", f"c{code}")
+
+class Cluster:
+    """Routes every room to one owning worker. Sockets that land elsewhere are relayed to the owner,
+    so any worker can serve any room. Draining hands rooms to their next owner via the backplane."""
+    def __init__(self, manager: ConnectionManager, backplane: Backplane, worker_id: str):
+        self.manager = manager
+        self.backplane = backplane
+        self.worker_id = worker_id
+        self.members: Dict[str, float] = {worker_id: time.monotonic()}
+        self.ring = HashRing([worker_id])
+        self.remote: Dict[str, Tuple[RemoteSocket, str]] = {}  # relayed conn id -> (proxy, room id)
+        self.relayed = 0  # local sockets pumped to another worker
+        self.draining = False
+        self.listening = time.monotonic()  # since when we've heard every heartbeat; reset while the backplane is down
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        manager.room_closed = self.release
+
+    async def start(self):
+        self.listening = time.monotonic()
+        await self.backplane.start()
+        await self.backplane.subscribe("workers", self.on_membership)
+        await self.backplane.subscribe(f"worker:{self.worker_id}", self.on_relay)
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+
+    async def heartbeat(self):
+        while True:
+            try: await self.backplane.publish("workers", f"hello\t{self.worker_id}")
+            except Exception as e: print(f"Heartbeat failed: {e}")
+            # Silence only means a peer is gone if we could have heard it: not while our subscriber reconnects
+            if not self.backplane.connected: self.listening = time.monotonic()
+            elif self.settled():
+                now = time.monotonic()
+                stale = [w for w, seen in self.members.items() if w != self.worker_id and now - seen > 3 * HEARTBEAT_INTERVAL]
+                for w in stale: del self.members[w]
+                if stale: self.rebuild()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def on_membership(self, message: str):
+        op, worker = message.split("\t", 1)
+        if worker == self.worker_id and self.draining: return
+        if op == "hello":
+            known = worker in self.members
+            self.members[worker] = time.monotonic()
+            if not known: self.rebuild()
+        elif op == "bye" and self.members.pop(worker, None): self.rebuild()
+
+    def rebuild(self):
+        self.ring = HashRing(sorted(self.members))
+
+    def settled(self) -> bool:
+        """Whether we've been listening long enough to have heard every live worker's heartbeat."""
+        return self.backplane.connected and time.monotonic() - self.listening > 3 * HEARTBEAT_INTERVAL
+
+    def alive(self, worker: Optional[str]) -> bool:
+        """Whether a room claim by `worker` should be honoured. Right after start, or after the backplane
+        reconnects, we may not have heard every heartbeat, so until then any claim is trusted rather than overwritten."""
+        if not worker: return False
+        return worker in self.members or not self.settled()
+
+    async def route(self, room_id: str) -> str:
+        if room_id in self.manager.rooms and not self.draining: return self.worker_id
+        # A live claim wins over the ring, so rooms stay put while workers come and go
+        claimed = await self.backplane.get(f"owner:{room_id}")
+        if self.alive(claimed) and not (claimed == self.worker_id and self.draining): return claimed
+        return self.ring.owner(room_id) or self.worker_id
+
+    async def adopt(self, room_id: str) -> str:
+        """Claims a room this worker is about to host, restoring handed-off state if there is any.
+        Returns the room's owner: this worker, or another that already holds a live claim on it."""
+        if room_id in self.manager.rooms: return self.worker_id
+        key = f"owner:{room_id}"
+        for _ in range(3):
+            if await self.backplane.set(key, self.worker_id, nx=True): break
+            claimed = await self.backplane.get(key)
+            if claimed == self.worker_id: break
+            if self.alive(claimed): return claimed
+            if claimed: await self.backplane.delete(key)  # left behind by a worker that is gone
+        else:
+            claimed = await self.backplane.get(key)
+            if claimed and claimed != self.worker_id: return claimed
+        state = await self.backplane.get(f"handoff:{room_id}")
+        if state and room_id not in self.manager.rooms:
+            await self.backplane.delete(f"handoff:{room_id}")
+            self.manager.import_room(room_id, json.loads(state))
+        return self.worker_id
+
+    def release(self, room_id: str):
+        if not self.draining: asyncio.create_task(self.unclaim(room_id))
+
+    async def unclaim(self, room_id: str):
+        try: await self.backplane.delete(f"owner:{room_id}")
+        except Exception as e: print(f"Backplane error: {e}")
+
+    async def relay(self, websocket: WebSocket, owner: str, room_id: str, name: str, tick: int):
+        """Edge side: pumps a local socket to and from the room's owner."""
+        await websocket.accept()
+        conn_id = uuid.uuid4().hex
+        # No history here to collapse into a redraw, so a slow relayed client is only ever evicted
+        queue = OutboundQueue(websocket, lambda ws: None, None)
+        def deliver(message: str):
+            if message[0] == "d": queue.put(Frame(text=message[1:], msg_type=""))
+            else: asyncio.create_task(websocket.close(code=int(message[1:])))
+        await self.backplane.subscribe(f"conn:{conn_id}", deliver)
+        target = f"worker:{owner}"
+        await self.backplane.publish(target, f"join\t{conn_id}\t" + json.dumps({"room": room_id, "name": name, "tick": tick}))
+        self.relayed += 1
+        bucket = TokenBucket(*CONNECTION_RATE_LIMIT)
+        try:
+            while True:
+                data = await websocket.receive_text()
+                if not bucket.take():
+                    THROTTLED_READS.inc()
+                    await bucket.acquire()
+                await self.backplane.publish(target, f"msg\t{conn_id}\t{data}")
+        except WebSocketDisconnect: pass
+        finally:
+            queue.close()
+            self.relayed -= 1
+            await self.backplane.unsubscribe(f"conn:{conn_id}", deliver)
+            await self.backplane.publish(target, f"leave\t{conn_id}\t")
+
+    async def on_relay(self, message: str):
+        """Owner side: relayed joins, frames and leaves from edge workers."""
+        op, conn_id, payload = message.split("\t", 2)
+        if op == "join":
+            info = json.loads(payload)
+            proxy = RemoteSocket(self.backplane, conn_id)
+            if await self.adopt(info["room"]) != self.worker_id:
+                # Another worker holds the room; the client reconnects and is routed there
+                return await proxy.close(code=1012)
+            self.remote[conn_id] = (proxy, info["room"])
+            await self.manager.connect(proxy, info["room"], info["name"], info["tick"])
+        elif op == "msg":
+            entry = self.remote.get(conn_id)
+            if entry: await self.manager.handle_message(entry[0], payload, entry[1])
+        elif op == "leave":
+            entry = self.remote.pop(conn_id, None)
+            if entry: self.manager.disconnect(*entry)
+
+    async def drain(self):
+        """Leaves the ring, parks every local room on the backplane and asks its clients to reconnect.
+        The worker keeps relaying for rooms owned elsewhere until it shuts down."""
+        if self.draining: return
+        self.draining = True
+        if self.heartbeat_task: self.heartbeat_task.cancel()
+        self.members.pop(self.worker_id, None)
+        self.rebuild()
+        for room_id, room in list(self.manager.rooms.items()):
+            try:
+                await self.backplane.set(f"handoff:{room_id}", json.dumps(self.manager.export_room(room)))
+                await self.backplane.delete(f"owner:{room_id}")
+            except Exception as e: print(f"Handoff of {room_id} failed: {e}")
+            for sock in list(room.players):
+                try: await sock.close(code=1012)  # service restart: the client reconnects to the new owner
+                except: pass
+        try: await self.backplane.publish("workers", f"bye\t{self.worker_id}")
+        except Exception as e: print(f"Backplane error: {e}")
 
 manager = ConnectionManager()
+cluster = Cluster(manager, RespBackplane.from_url(BACKPLANE_URL) if BACKPLANE_URL else InProcessBackplane(), WORKER_ID)
+
+@app.on_event("startup")
+async def startup():
+    lag_monitor.start()
+    await cluster.start()
+    # Workers behind one port can't be told apart over HTTP, so `kill -USR1 <pid>` drains a specific one
+    try: asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, lambda: asyncio.create_task(cluster.drain()))
+    except (NotImplementedError, AttributeError, RuntimeError, ValueError): pass
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Best effort: uvicorn has already closed its sockets by now, so call /admin/drain first to keep games alive
+    await cluster.drain()
+    await cluster.backplane.close()
+    lag_monitor.stop()
+
+def require_local(request: Request):
+    if request.client and request.client.host not in ("127.0.0.1", "::1"): raise HTTPException(status_code=403)
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/drain")
+async def drain(request: Request):
+    require_local(request)
+    await cluster.drain()
+    return {"worker": cluster.worker_id, "draining": True}
+
+@app.get("/admin/trace")
+async def trace_report(request: Request, limit: int = 20):
+    """Estimated time per (room, message type) from sampled spans, most CPU first."""
+    require_local(request)
+    return {"sample_rate": tracer.sample_rate, "since": tracer.since, "top": tracer.top(limit)}
+
+@app.post("/admin/trace")
+async def trace_config(request: Request, rate: float, reset: bool = True):
+    """Sets the sampling rate at runtime (0 turns tracing off); resets the totals unless reset=false."""
+    require_local(request)
+    tracer.configure(rate)
+    if reset: tracer.reset()
+    return {"sample_rate": tracer.sample_rate}
 
 @app.websocket("/ws/{room_id}/{name}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str, name: str):
-    await manager.connect(websocket, room_id, name)
+async def websocket_endpoint(websocket: WebSocket, room_id: str, name: str, tick: int = 0):
+    owner = await cluster.route(room_id)
+    if owner == cluster.worker_id: owner = await cluster.adopt(room_id)
+    if owner != cluster.worker_id:
+        return await cluster.relay(websocket, owner, room_id, name, tick)
+    await manager.connect(websocket, room_id, name, tick)
+    bucket = TokenBucket(*CONNECTION_RATE_LIMIT)
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await receive_frame(websocket)
+            if not bucket.take():
+                # Stop reading until the budget refills; the flood backs up in the client's TCP window
+                THROTTLED_READS.inc()
+                await bucket.acquire()
             await manager.handle_message(websocket, data, room_id)
     except WebSocketDisconnect:
         manager.disconnect(websocket, room_id)
\ No newline at end of file
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import math
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# --- METRIC TYPES ---
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{escape(v)}"' for n, v in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    if value == math.inf: return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Metric:
+    """Base for labelled metrics. labels(...) returns a child that hot paths can bind once and reuse."""
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names: self.unlabelled = self.labels()
+
+    def labels(self, *values: str):
+        child = self.children.get(values)
+        if child is None: child = self.children[values] = self.child()
+        return child
+
+    def child(self): raise NotImplementedError
+
+    def samples(self) -> Iterable[str]:
+        for values, child in list(self.children.items()):
+            yield f"{self.name}{format_labels(self.label_names, values)} {format_value(child.value)}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class Counter(Metric):
+    kind = "counter"
+
+    def child(self): return Value()
+
+    def inc(self, amount: float = 1):
+        self.unlabelled.value += amount
+
+class Gauge(Metric):
+    """A settable value, or one computed at scrape time when `collect` is given (returns {labels: value})."""
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        self.collect = collect
+        super().__init__(name, doc, labels)
+
+    def child(self): return Value()
+
+    def set(self, value: float):
+        self.unlabelled.value = value
+
+    def samples(self) -> Iterable[str]:
+        if not self.collect: return super().samples()
+        return (f"{self.name}{format_labels(self.label_names, values)} {format_value(value)}"
+                for values, value in self.collect().items())
+
+class Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labels)
+
+    def child(self): return Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self.unlabelled.observe(value)
+
+    def samples(self) -> Iterable[str]:
+        for values, child in list(self.children.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                total += count
+                le = 'le="%s"' % format_value(bound)
+                yield f"{self.name}_bucket{format_labels(self.label_names, values, le)} {total}"
+            yield f"{self.name}_sum{format_labels(self.label_names, values)} {child.sum!r}"
+            yield f"{self.name}_count{format_labels(self.label_names, values)} {child.count}"
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, doc: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, doc, labels))
+
+    def gauge(self, name: str, doc: str, labels: Tuple[str, ...] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, doc, labels, collect))
+
+    def histogram(self, name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self.metrics:
+            try: lines += metric.render()
+            except Exception as e: print(f"Metrics error in {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+# --- EVENT LOOP LAG ---
+
+class LoopLagMonitor:
+    """Measures how late a fixed-interval sleep wakes up: time the loop spent busy with something else."""
+    def __init__(self, histogram: Histogram, gauge: Gauge, interval: float = 0.5):
+        self.histogram = histogram
+        self.gauge = gauge
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not self.task: self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task: self.task.cancel()
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.histogram.observe(lag)
+            self.gauge.set(lag)
+
+# --- SAMPLING TRACER ---
+
+class Tracer:
+    """Samples a fraction of hot-path calls and attributes their wall and CPU time to (room, kind).
+
+    With sample_rate 0 the only cost at a call site is the `tracer.enabled` check. Totals are scaled
+    by 1/sample_rate, so they estimate the full load. `hook`, if set, receives every sampled span as
+    hook(room_id, kind, wall_seconds, cpu_seconds), e.g. to forward it to an external tracer.
+    """
+    def __init__(self, sample_rate: float = 0.0, hook: Optional[Callable[[str, str, float, float], None]] = None):
+        self.hook = hook
+        self.totals: Dict[Tuple[str, str], List[float]] = {}  # (room, kind) -> [calls, wall, cpu]
+        self.since = time.time()
+        self.configure(sample_rate)
+
+    def configure(self, sample_rate: float):
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.enabled = self.sample_rate > 0
+
+    def reset(self):
+        self.totals = {}
+        self.since = time.time()
+
+    def start(self) -> Optional[Tuple[float, float]]:
+        if random.random() >= self.sample_rate: return None
+        return time.perf_counter(), time.thread_time()
+
+    def finish(self, span: Optional[Tuple[float, float]], room_id: str, kind: str):
+        if span is None: return
+        wall, cpu = time.perf_counter() - span[0], time.thread_time() - span[1]
+        scale = 1 / self.sample_rate if self.sample_rate else 1
+        entry = self.totals.get((room_id, kind))
+        if entry is None: entry = self.totals[(room_id, kind)] = [0.0, 0.0, 0.0]
+        entry[0] += scale
+        entry[1] += wall * scale
+        entry[2] += cpu * scale
+        if self.hook:
+            try: self.hook(room_id, kind, wall, cpu)
+            except Exception as e: print(f"Trace hook error: {e}")
+
+    def top(self, limit: int = 20) -> List[dict]:
+        ranked = sorted(self.totals.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [{"room": room, "kind": kind, "calls": round(calls), "wall_s": round(wall, 6), "cpu_s": round(cpu, 6)}
+                for (room, kind), (calls, wall, cpu) in ranked]
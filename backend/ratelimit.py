@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+
+Budget = Tuple[float, float]  # (tokens per second, burst)
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def take(self) -> bool:
+        self.refill()
+        if self.tokens < 1 - 1e-9: return False
+        self.tokens -= 1
+        return True
+
+    def wait(self) -> float:
+        """Seconds until the next token is available."""
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    async def acquire(self):
+        """Waits for a token instead of failing, e.g. to stop reading a socket until its budget refills."""
+        while not self.take(): await asyncio.sleep(self.wait())
+
+class Limiter:
+    """One connection's token buckets, one per message type, created on first use.
+    Types without their own budget share the "other" bucket."""
+    __slots__ = ("budgets", "buckets")
+
+    def __init__(self, budgets: Dict[str, Budget]):
+        self.budgets = budgets
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, kind: str) -> TokenBucket:
+        if kind not in self.budgets: kind = "other"
+        bucket = self.buckets.get(kind)
+        if bucket is None: bucket = self.buckets[kind] = TokenBucket(*self.budgets[kind])
+        return bucket
+
+    def allow(self, kind: str) -> bool:
+        return self.bucket(kind).take()
+
+    def wait(self, kind: str) -> float:
+        return self.bucket(kind).wait()
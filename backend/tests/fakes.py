@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from fastapi import WebSocketDisconnect
+
+from timing_wheel import TimingWheel
+
+TICK = 0.1
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_wheel():
+    clock = Clock()
+    return clock, TimingWheel(tick=TICK, clock=clock, autostart=False)
+
+def run_to(clock, wheel, seconds):
+    clock.now += seconds
+    wheel.advance()
+
+class FakeSocket:
+    headers = {}
+
+    def __init__(self):
+        self.sent = []
+        self.incoming = asyncio.Queue()  # what the client sends; None hangs up
+        self.close_code = None
+
+    async def accept(self, subprotocol=None): pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def receive_text(self):
+        data = await self.incoming.get()
+        if data is None: raise WebSocketDisconnect(1000)
+        return data
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+    def types(self):
+        return [m["type"] for m in self.sent]
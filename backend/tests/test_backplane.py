@@ -0,0 +1,76 @@
+import asyncio
+import socket
+
+import pytest
+
+from backplane import InProcessBackplane, RespBackplane, serve
+
+def test_every_subscriber_gets_the_message():
+    async def scenario():
+        bp = InProcessBackplane()
+        got = []
+        first = lambda m: got.append(("first", m))
+        async def second(m): got.append(("second", m))
+        await bp.subscribe("workers", first)
+        await bp.subscribe("workers", second)
+        await bp.publish("workers", "hello")
+        await bp.unsubscribe("workers", first)
+        await bp.publish("workers", "again")
+        await bp.unsubscribe("workers")
+        await bp.publish("workers", "nobody")
+        return got, bp.handlers
+    got, handlers = asyncio.run(scenario())
+    assert got == [("first", "hello"), ("second", "hello"), ("second", "again")]
+    assert handlers == {}
+
+def test_set_nx():
+    async def scenario():
+        bp = InProcessBackplane()
+        assert await bp.set("owner:R", "w1", nx=True)
+        assert not await bp.set("owner:R", "w2", nx=True)
+        assert await bp.get("owner:R") == "w1"
+        await bp.delete("owner:R")
+        assert await bp.set("owner:R", "w2", nx=True)
+    asyncio.run(scenario())
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_resp_subscriber_reconnects():
+    async def scenario():
+        port = free_port()
+        server = asyncio.create_task(serve(port=port))
+        await asyncio.sleep(0.1)
+        listener, sender = RespBackplane(port=port), RespBackplane(port=port)
+        await listener.start()
+        await sender.start()
+        got = []
+        await listener.subscribe("workers", got.append)
+        await listener.subscribe("worker:w1", got.append)
+        await asyncio.sleep(0.05)
+        await sender.publish("workers", "one")
+        await asyncio.sleep(0.05)
+
+        listener.sub[1].transport.abort()  # the subscriber connection drops
+        await asyncio.sleep(0.01)
+        assert not listener.connected
+        for _ in range(50):
+            if listener.connected: break
+            await asyncio.sleep(0.02)
+        assert listener.connected
+        await asyncio.sleep(0.05)
+        await sender.publish("workers", "two")
+        await sender.publish("worker:w1", "three")
+        await asyncio.sleep(0.05)
+
+        sender.cmd[1].transport.abort()  # a failed command reopens the connection for the next one
+        await asyncio.sleep(0.01)
+        with pytest.raises((OSError, asyncio.IncompleteReadError)): await sender.publish("workers", "lost")
+        await sender.publish("workers", "four")
+        await asyncio.sleep(0.05)
+        for bp in (listener, sender): await bp.close()
+        server.cancel()
+        return got
+    assert asyncio.run(scenario()) == ["one", "two", "three", "four"]
@@ -0,0 +1,200 @@
+import asyncio
+import json
+
+from backplane import HashRing, InProcessBackplane
+from fakes import FakeSocket, make_wheel
+
+# --- HASH RING ---
+
+def test_hash_ring_moves_few_rooms():
+    rooms = [f"room{i}" for i in range(2000)]
+    three = HashRing(["w1", "w2", "w3"])
+    four = HashRing(["w1", "w2", "w3", "w4"])
+    before = {room: three.owner(room) for room in rooms}
+    assert set(before.values()) == {"w1", "w2", "w3"}
+    assert HashRing(["w3", "w1", "w2"]).owner("room7") == before["room7"]  # independent of insertion order
+    moved = [room for room in rooms if four.owner(room) != before[room]]
+    # Only rooms taken over by the new worker move, about a quarter of them
+    assert all(four.owner(room) == "w4" for room in moved)
+    assert 0.1 < len(moved) / len(rooms) < 0.4
+    assert HashRing().owner("room1") is None
+
+# --- CLUSTER ---
+
+async def settle():
+    for _ in range(10): await asyncio.sleep(0)
+
+async def make_cluster(backplane, worker_id, wheel):
+    import main
+    cluster = main.Cluster(main.ConnectionManager(scheduler=wheel), backplane, worker_id)
+    await cluster.start()
+    return cluster
+
+def settled(cluster):
+    """Membership counts as settled, so claims by unknown workers are treated as stale."""
+    cluster.listening -= 10
+
+def run(scenario):
+    async def wrapper():
+        clock, wheel = make_wheel()
+        bp = InProcessBackplane()
+        w1 = await make_cluster(bp, "w1", wheel)
+        w2 = await make_cluster(bp, "w2", wheel)
+        await settle()  # first heartbeats
+        try: await scenario(bp, w1, w2)
+        finally:
+            for cluster in (w1, w2): cluster.heartbeat_task.cancel()
+    asyncio.run(wrapper())
+
+def test_workers_see_each_other():
+    async def scenario(bp, w1, w2):
+        assert set(w1.members) == set(w2.members) == {"w1", "w2"}
+        assert w1.ring.owner("R") == w2.ring.owner("R")
+    run(scenario)
+
+def test_adopt_claims_once():
+    async def scenario(bp, w1, w2):
+        assert await w1.adopt("R") == "w1"
+        assert await w2.adopt("R") == "w1"  # a live claim is never overwritten
+        assert await w1.adopt("R") == "w1"
+        assert await bp.get("owner:R") == "w1"
+    run(scenario)
+
+def test_adopt_stale_claim():
+    async def scenario(bp, w1, w2):
+        await bp.set("owner:R", "gone")
+        # Until membership settles, an unknown worker's claim may just be one we haven't heard from yet
+        assert await w1.adopt("R") == "gone"
+        settled(w1)
+        assert await w1.adopt("R") == "w1"
+        assert await bp.get("owner:R") == "w1"
+    run(scenario)
+
+def test_claims_trusted_while_backplane_down():
+    async def scenario(bp, w1, w2):
+        await bp.set("owner:R", "gone")
+        settled(w1)
+        bp.connected = False  # e.g. the subscriber is reconnecting: no heartbeats, so no evidence "gone" is gone
+        assert await w1.adopt("R") == "gone" and await w1.route("R") == "gone"
+        bp.connected = True
+        assert await w1.adopt("R") == "w1"
+    run(scenario)
+
+def test_route():
+    async def scenario(bp, w1, w2):
+        ring_owner = w1.ring.owner("R")
+        assert await w1.route("R") == ring_owner == await w2.route("R")
+        await bp.set("owner:R", "w2")
+        assert await w1.route("R") == "w2"
+        settled(w1)
+        await bp.set("owner:R", "gone")
+        assert await w1.route("R") == ring_owner
+        await bp.delete("owner:R")
+        assert await w1.adopt("Q") == "w1"
+        assert await w1.route("Q") == "w1" and await w2.route("Q") == "w1"
+    run(scenario)
+
+def test_relay_join_msg_leave():
+    async def scenario(bp, w1, w2):
+        alice, bob = FakeSocket(), FakeSocket()
+        assert await w1.adopt("R") == "w1"
+        await w1.manager.connect(alice, "R", "alice")
+        edge = asyncio.create_task(w2.relay(bob, "w1", "R", "bob", 0))
+        await settle()
+        room = w1.manager.rooms["R"]
+        assert w2.relayed == 1 and len(w1.remote) == 1
+        assert [p.name for p in room.players.values()] == ["alice", "bob"]
+        assert bob.types()[0] == "game_state"
+        assert "R" not in w2.manager.rooms
+
+        guesser = alice if room.drawer is not alice else bob
+        if guesser is bob: bob.incoming.put_nowait(json.dumps({"type": "chat", "message": "hi"}))
+        else: await w1.manager.handle_message(alice, json.dumps({"type": "chat", "message": "hi"}), "R")
+        await settle()
+        name = "bob" if guesser is bob else "alice"
+        for sock in (alice, bob): assert {"type": "chat", "message": f"{name}: hi"} in sock.sent
+
+        bob.incoming.put_nowait(None)
+        await edge
+        await settle()
+        assert w2.relayed == 0 and not w1.remote and not [ch for ch in bp.handlers if ch.startswith("conn:")]
+        assert [p.name for p in room.players.values()] == ["alice"]
+        w1.manager.disconnect(alice, "R")
+        await settle()
+        assert "R" not in w1.manager.rooms and await bp.get("owner:R") is None  # released when empty
+    run(scenario)
+
+def test_relay_to_non_owner_is_bounced():
+    async def scenario(bp, w1, w2):
+        assert await w2.adopt("R") == "w2"
+        bob = FakeSocket()
+        edge = asyncio.create_task(w1.relay(bob, "w1", "R", "bob", 0))  # stale routing: w1 doesn't own R
+        await settle()
+        assert bob.close_code == 1012 and "R" not in w1.manager.rooms and not w1.remote
+        bob.incoming.put_nowait(None)
+        await edge
+    run(scenario)
+
+def test_drain_hands_room_to_next_worker():
+    import main
+
+    async def scenario(bp, w1, w2):
+        alice, bob = FakeSocket(), FakeSocket()
+        assert await w1.adopt("R") == "w1"
+        await w1.manager.connect(alice, "R", "alice")
+        await w1.manager.connect(bob, "R", "bob")
+        await settle()
+        room = w1.manager.rooms["R"]
+        drawer = room.drawer
+        await w1.manager.start_actual_game("R", room.word_choices[0])
+        await w1.manager.handle_message(drawer, json.dumps(
+            {"type": "draw", "strokeId": "s1", "color": "#000", "prevX": 0, "prevY": 0, "currX": 5, "currY": 5}), "R")
+        room.players[alice].score = 300
+        snapshot, word, drawer_name = room.history.snapshot(), room.word, room.players[drawer].name
+
+        await w1.drain()
+        assert alice.close_code == bob.close_code == 1012
+        assert set(w2.members) == {"w2"} and await bp.get("owner:R") is None
+        assert await w2.route("R") == "w2"
+
+        assert await w2.adopt("R") == "w2"
+        assert await bp.get("handoff:R") is None
+        moved = w2.manager.rooms["R"]
+        assert moved.history.snapshot() == snapshot and moved.word == word and moved.matcher
+        assert moved.restored_scores == {"alice": 300, "bob": 0}
+        assert {"round_end", "handoff_expiry"} <= set(moved.timers)
+
+        back = FakeSocket()
+        await w2.manager.connect(back, "R", drawer_name)
+        await settle()
+        state = back.sent[0]
+        assert state["role"] == "drawer" and state["word"] == word
+        assert back.sent[1] == {"type": "redraw", "history": snapshot}
+        assert "handoff_expiry" not in moved.timers
+        w2.manager.disconnect(back, "R")
+    run(scenario)
+
+def test_guessers_score_once_across_handoff():
+    async def scenario(bp, w1, w2):
+        socks = {name: FakeSocket() for name in ("alice", "bob", "carol")}
+        assert await w1.adopt("R") == "w1"
+        for name, sock in socks.items(): await w1.manager.connect(sock, "R", name)
+        await settle()
+        room = w1.manager.rooms["R"]
+        await w1.manager.start_actual_game("R", room.word_choices[0])
+        guessers = [name for name, sock in socks.items() if sock is not room.drawer]
+        guess = json.dumps({"type": "chat", "message": room.word})
+        await w1.manager.handle_message(socks[guessers[0]], guess, "R")
+        assert room.players[socks[guessers[0]]].score == 100
+
+        await w1.drain()
+        assert await w2.adopt("R") == "w2"
+        moved = w2.manager.rooms["R"]
+        back = {name: FakeSocket() for name in guessers}
+        for name, sock in back.items(): await w2.manager.connect(sock, "R", name)
+        for sock in back.values(): await w2.manager.handle_message(sock, guess, "R")
+        await settle()
+        # The first guesser already scored before the drain; only the other one does now
+        assert {moved.players[sock].name: moved.players[sock].score for sock in back.values()} == {guessers[0]: 100, guessers[1]: 100}
+        assert sum(m["type"] == "correct_guess" for m in back[guessers[0]].sent) == 1
+    run(scenario)
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from fakes import FakeSocket, make_wheel
+
+def test_segments_merge_into_polylines():
+    import main
+    history = main.DrawHistory()
+    for x in range(3):
+        history.append({"type": "draw", "strokeId": "s1", "color": "#000", "prevX": x, "prevY": 0, "currX": x + 1, "currY": 0})
+    history.append({"type": "fill", "strokeId": "s2", "color": "#f00", "x": 5, "y": 6})
+    assert history.snapshot() == [
+        {"type": "stroke", "strokeId": "s1", "color": "#000", "points": [0.0, 0.0, 1.0, 0.0, 2.0, 0.0, 3.0, 0.0]},
+        {"type": "fill", "x": 5.0, "y": 6.0, "color": "#f00", "strokeId": "s2"},
+    ]
+    assert history.segments == 4
+    assert history.undo() == "s2" and history.segments == 3
+
+@pytest.mark.parametrize("frame", [
+    {"type": "fill", "strokeId": "s9", "color": "#000", "x": None, "y": 1},
+    {"type": "fill", "strokeId": "s9", "color": "#000"},
+    {"type": "draw", "strokeId": "s9", "color": "#000", "prevX": 0, "prevY": 0, "currX": "left", "currY": 1},
+    {"type": "draw", "strokeId": "s9", "color": ["#000"], "prevX": 0, "prevY": 0, "currX": 1, "currY": 1},
+])
+def test_bad_frame_is_rejected_without_changes(frame):
+    import main
+    history = main.DrawHistory()
+    history.append({"type": "draw", "strokeId": "s1", "color": "#000", "prevX": 0, "prevY": 0, "currX": 1, "currY": 1})
+    before = history.snapshot()
+    with pytest.raises((TypeError, ValueError)): history.append(frame)
+    assert history.snapshot() == before and len(history) == 1 and history.segments == 1
+    json.loads(history.redraw_frame().text)
+
+def test_numeric_stroke_id_is_keyed_as_string():
+    import main
+    history = main.DrawHistory()
+    history.append({"type": "draw", "strokeId": 7, "color": "#000", "prevX": 0, "prevY": 0, "currX": 1, "currY": 1})
+    history.append({"type": "draw", "strokeId": "7", "color": "#000", "prevX": 1, "prevY": 1, "currX": 2, "currY": 2})
+    assert len(history) == 1 and history.snapshot()[0]["strokeId"] == "7"
+    assert json.loads(history.redraw_frame().text)["history"][0]["points"] == [0.0, 0.0, 1.0, 1.0, 2.0, 2.0]
+
+def test_joiner_gets_redraw_after_bad_drawer_frames():
+    import main
+
+    async def scenario():
+        clock, wheel = make_wheel()
+        manager = main.ConnectionManager(scheduler=wheel)
+        a, b = FakeSocket(), FakeSocket()
+        await manager.connect(a, "H", "alice")
+        await manager.connect(b, "H", "bob")
+        room = manager.rooms["H"]
+        drawer = room.drawer
+        for frame in ({"type": "fill", "x": None, "y": 0, "color": "#000", "strokeId": "bad"},
+                      {"type": "draw", "strokeId": 3, "color": "#000", "prevX": 0, "prevY": 0, "currX": 4, "currY": 4}):
+            await manager.handle_message(drawer, json.dumps(frame), "H")
+        c = FakeSocket()
+        await manager.connect(c, "H", "carol")
+        await asyncio.sleep(0)
+        redraw = [m for m in c.sent if m["type"] == "redraw"]
+        assert c in room.players and redraw == [{"type": "redraw", "history": [
+            {"type": "stroke", "strokeId": "3", "color": "#000", "points": [0.0, 0.0, 4.0, 4.0]}]}]
+        for sock in (a, b, c): manager.disconnect(sock, "H")
+
+    asyncio.run(scenario())
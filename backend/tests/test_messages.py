@@ -0,0 +1,26 @@
+import asyncio
+import json
+
+import pytest
+
+from fakes import FakeSocket, make_wheel
+
+@pytest.mark.parametrize("data", ['{"type": [1]}', '{"type": {}}', '{"type": null}', '[1]', '"chat"', 'not json'])
+def test_malformed_message_is_contained(data):
+    import main
+
+    async def scenario():
+        clock, wheel = make_wheel()
+        manager = main.ConnectionManager(scheduler=wheel)
+        sock = FakeSocket()
+        await manager.connect(sock, "M", "alice")
+        await manager.handle_message(sock, data, "M")  # must return, not raise
+        await manager.handle_message(sock, json.dumps({"type": "chat", "message": "still here"}), "M")
+        await asyncio.sleep(0)
+        assert sock in manager.rooms["M"].players
+        assert any(m["type"] == "chat" and m["message"] == "alice: still here" for m in sock.sent)
+        manager.disconnect(sock, "M")
+        assert "M" not in manager.rooms
+
+    asyncio.run(scenario())
+    assert not [labels for labels in main.MESSAGE_SECONDS.children if labels[0] not in main.MESSAGE_TYPES | {"other", "invalid"}]
@@ -0,0 +1,156 @@
+import asyncio
+
+from fakes import TICK, FakeSocket, make_wheel, run_to
+from timing_wheel import WHEEL_SIZE
+
+def test_fire_times_across_cascades():
+    clock, wheel = make_wheel()
+    fired = {}
+    ticks = [1, 2, WHEEL_SIZE - 1, WHEEL_SIZE, WHEEL_SIZE + 1, WHEEL_SIZE ** 2 - 1, WHEEL_SIZE ** 2,
+             WHEEL_SIZE ** 2 + 3, WHEEL_SIZE ** 3 + 5]
+    for n in ticks:
+        wheel.schedule(n * TICK, lambda n=n: fired.setdefault(n, wheel.current))
+    assert len(wheel) == len(ticks)
+    # Step in uneven jumps so cascades happen mid-advance
+    while len(fired) < len(ticks):
+        run_to(clock, wheel, 37 * TICK)
+    for n in ticks:
+        assert fired[n] == n, f"timer for {n} ticks fired at {fired[n]}"
+    assert len(wheel) == 0
+
+def test_never_fires_early():
+    clock, wheel = make_wheel()
+    fired = []
+    wheel.schedule(1.05, fired.append, "t")
+    run_to(clock, wheel, 1.0)
+    assert fired == []
+    run_to(clock, wheel, 0.1)
+    assert fired == ["t"]
+
+def test_same_tick_fires_in_deadline_order():
+    clock, wheel = make_wheel()
+    fired = []
+    wheel.schedule(0.5, fired.append, "b")
+    wheel.schedule(0.3, fired.append, "a")
+    run_to(clock, wheel, 1.0)
+    assert fired == ["a", "b"]
+
+def test_cancel():
+    clock, wheel = make_wheel()
+    fired = []
+    keep = wheel.schedule(1.0, fired.append, "keep")
+    drop = wheel.schedule(1.0, fired.append, "drop")
+    far = wheel.schedule(WHEEL_SIZE ** 2 * TICK, fired.append, "far")
+    wheel.cancel(drop)
+    wheel.cancel(far)
+    wheel.cancel(drop)  # cancelling twice is a no-op
+    assert len(wheel) == 1
+    run_to(clock, wheel, WHEEL_SIZE ** 2 * TICK + 1)
+    assert fired == ["keep"] and keep.slot is None
+
+def test_reschedule():
+    clock, wheel = make_wheel()
+    fired = []
+    later = wheel.schedule(1.0, fired.append, "later")
+    sooner = wheel.schedule(10.0, fired.append, "sooner")
+    wheel.reschedule(later, 20.0)
+    wheel.reschedule(sooner, 0.5)
+    assert len(wheel) == 2
+    run_to(clock, wheel, 1.0)
+    assert fired == ["sooner"]
+    run_to(clock, wheel, 18.0)
+    assert fired == ["sooner"]
+    assert 0.9 <= wheel.remaining(later) <= 1.0
+    run_to(clock, wheel, 1.0)
+    assert fired == ["sooner", "later"]
+
+def test_reschedule_after_cancel_revives():
+    clock, wheel = make_wheel()
+    fired = []
+    timer = wheel.schedule(1.0, fired.append, "x")
+    wheel.cancel(timer)
+    wheel.reschedule(timer, 2.0)
+    run_to(clock, wheel, 3.0)
+    assert fired == ["x"]
+
+def test_cancel_due_but_unfired():
+    clock, wheel = make_wheel()
+    fired = []
+    # Both are due in the same advance(); the first one cancels the second before it runs
+    second = wheel.schedule(0.5, fired.append, "second")
+    wheel.schedule(0.3, lambda: (fired.append("first"), wheel.cancel(second)))
+    run_to(clock, wheel, 1.0)
+    assert fired == ["first"]
+    assert len(wheel) == 0
+
+def test_cancel_after_deadline_before_advance():
+    clock, wheel = make_wheel()
+    fired = []
+    timer = wheel.schedule(0.5, fired.append, "x")
+    clock.now += 5.0  # past due, but the driver hasn't run yet
+    wheel.cancel(timer)
+    wheel.advance()
+    assert fired == []
+
+def test_coroutine_callbacks_run_as_tasks():
+    async def scenario():
+        clock, wheel = make_wheel()
+        fired = []
+        async def callback(): fired.append("coro")
+        wheel.schedule(0.2, callback)
+        run_to(clock, wheel, 1.0)
+        await asyncio.sleep(0)
+        return fired
+    assert asyncio.run(scenario()) == ["coro"]
+
+# --- ROOM SEQUENCING ---
+
+def test_room_round_sequencing():
+    import main
+
+    async def scenario():
+        clock, wheel = make_wheel()
+        manager = main.ConnectionManager(scheduler=wheel)
+        a, b = FakeSocket(), FakeSocket()
+        await manager.connect(a, "T", "alice")
+        await manager.connect(b, "T", "bob")
+        room = manager.rooms["T"]
+
+        async def step(seconds):
+            run_to(clock, wheel, seconds)
+            for _ in range(3): await asyncio.sleep(0)
+
+        await step(0)
+        assert room.drawer is not None and set(room.timers) == {"selection"}
+        guesser = b if room.drawer is a else a
+        assert "choosing" in guesser.types()
+
+        # Nobody picks a word: the first choice is taken when selection times out
+        await step(main.SELECTION_TIMEOUT - 0.2)
+        assert "new_round" not in guesser.types()
+        await step(0.3)
+        assert "new_round" in guesser.types() and room.word
+        assert set(room.timers) == {"hint_30", "hint_15", "resync", "round_end"}
+
+        hints = lambda: [m for m in guesser.sent if m["type"] == "hint_update"]
+        await step(main.ROUND_DURATION - main.HINT_TIMES[0] - 0.2)
+        assert not hints()
+        await step(0.3)
+        assert len(hints()) == 1
+        await step(main.HINT_TIMES[0] - main.HINT_TIMES[1])
+        assert len(hints()) == 2
+
+        await step(main.HINT_TIMES[1])
+        assert any(m["type"] == "chat" and "Time's up" in m["message"] for m in guesser.sent)
+        assert set(room.timers) == {"next_round"}
+
+        choosing_before = guesser.types().count("choosing") + guesser.types().count("choose_word")
+        await step(3.1)
+        assert guesser.types().count("choosing") + guesser.types().count("choose_word") == choosing_before + 1
+        assert set(room.timers) == {"selection"}
+
+        manager.disconnect(a, "T")
+        manager.disconnect(b, "T")
+        assert "T" not in manager.rooms and len(wheel) == 0
+
+    asyncio.run(scenario())
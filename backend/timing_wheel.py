@@ -0,0 +1,140 @@
+import asyncio
+import math
+import time
+from typing import Callable, List, Optional, Set
+
+WHEEL_BITS = 6                  # 64 slots per level
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+WHEEL_LEVELS = 4                # 64^4 ticks: ~19 days at 100 ms resolution
+EPSILON = 1e-9                  # in ticks; keeps float error from pushing a deadline onto the next tick
+
+class Timer:
+    __slots__ = ("deadline", "callback", "args", "cancelled", "slot")
+
+    def __init__(self, deadline: int, callback: Callable, args: tuple):
+        self.deadline = deadline  # absolute tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.slot: Optional[Set["Timer"]] = None
+
+class TimingWheel:
+    """Hierarchical timing wheel driving every room's deadlines from one task.
+
+    schedule/cancel/reschedule are O(1). A single driver task wakes once per tick and fires the
+    due slot; far-off timers sit in coarser levels and cascade down as the wheel turns. Pass a
+    fake `clock` and call advance() to step time by hand (autostart=False keeps the driver off).
+    """
+    def __init__(self, tick: float = 0.1, clock: Callable[[], float] = time.monotonic, autostart: bool = True):
+        self.tick = tick
+        self.clock = clock
+        self.autostart = autostart
+        self.origin = clock()
+        self.current = 0
+        self.count = 0
+        self.wheels: List[List[Set[Timer]]] = [[set() for _ in range(WHEEL_SIZE)] for _ in range(WHEEL_LEVELS)]
+        self.pending = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Runs callback(*args) after `delay` seconds. Coroutines returned by it are run as tasks."""
+        if not self.count: self.current = max(self.current, self.elapsed_ticks())
+        timer = Timer(self.deadline_for(delay), callback, args)
+        self.place(timer)
+        self.count += 1
+        self.pending.set()
+        if self.autostart and not self.task: self.start()
+        return timer
+
+    def cancel(self, timer: Optional[Timer]):
+        if not timer or timer.cancelled: return
+        timer.cancelled = True
+        if timer.slot is not None:
+            timer.slot.discard(timer)
+            timer.slot = None
+            self.count -= 1
+
+    def reschedule(self, timer: Timer, delay: float) -> Timer:
+        if timer.slot is not None:
+            timer.slot.discard(timer)
+            self.count -= 1
+        timer.cancelled = False
+        timer.deadline = self.deadline_for(delay)
+        self.place(timer)
+        self.count += 1
+        self.pending.set()
+        return timer
+
+    def remaining(self, timer: Timer) -> float:
+        return max(0.0, (timer.deadline * self.tick + self.origin) - self.clock())
+
+    def deadline_for(self, delay: float) -> int:
+        # Round up so a timer never fires early, and always at least one tick out
+        elapsed = (self.clock() - self.origin + max(delay, 0.0)) / self.tick
+        return max(self.current + 1, math.ceil(elapsed - EPSILON))
+
+    def elapsed_ticks(self) -> int:
+        return math.floor((self.clock() - self.origin) / self.tick + EPSILON)
+
+    def place(self, timer: Timer):
+        diff = timer.deadline - self.current
+        if diff <= 0:
+            level, idx = 0, self.current & WHEEL_MASK
+        else:
+            for level in range(WHEEL_LEVELS):
+                if diff < 1 << (WHEEL_BITS * (level + 1)): break
+            else:
+                diff = (1 << (WHEEL_BITS * WHEEL_LEVELS)) - 1  # park at the far edge, re-placed on cascade
+            idx = ((self.current + diff) >> (WHEEL_BITS * level)) & WHEEL_MASK
+        slot = self.wheels[level][idx]
+        slot.add(timer)
+        timer.slot = slot
+
+    def advance(self):
+        """Fires everything due up to the clock's current time."""
+        target = self.elapsed_ticks()
+        while self.current < target:
+            self.current += 1
+            self.cascade()
+            slot = self.wheels[0][self.current & WHEEL_MASK]
+            if not slot: continue
+            due = [t for t in slot if t.deadline <= self.current]
+            for timer in due:
+                slot.discard(timer)
+                timer.slot = None
+                self.count -= 1
+            for timer in sorted(due, key=lambda t: t.deadline):
+                if not timer.cancelled: self.fire(timer)
+
+    def cascade(self):
+        top = 0
+        while top + 1 < WHEEL_LEVELS and self.current & ((1 << (WHEEL_BITS * (top + 1))) - 1) == 0:
+            top += 1
+        for level in range(top, 0, -1):
+            idx = (self.current >> (WHEEL_BITS * level)) & WHEEL_MASK
+            slot, self.wheels[level][idx] = self.wheels[level][idx], set()
+            for timer in slot: self.place(timer)
+
+    def fire(self, timer: Timer):
+        try:
+            result = timer.callback(*timer.args)
+            if asyncio.iscoroutine(result): asyncio.get_running_loop().create_task(result)
+        except Exception as e: print(f"Timer error: {e}")
+
+    def start(self):
+        try: self.task = asyncio.get_running_loop().create_task(self.run())
+        except RuntimeError: pass  # no loop yet; the next schedule() from inside one starts it
+
+    async def run(self):
+        while True:
+            if not self.count:
+                # Nothing scheduled: sleep until schedule() wakes us, then resync to the clock
+                self.pending.clear()
+                await self.pending.wait()
+            next_tick = self.origin + (self.current + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick - self.clock()))
+            self.advance()
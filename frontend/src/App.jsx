@@ -270,6 +270,8 @@ function Game() {
   const [wordChoices, setWordChoices] = useState([]);
   const [isGameStarted, setIsGameStarted] = useState(false);
   const currentStrokeId = useRef(null);
+  const roundEnd = useRef(null); // local deadline derived from the server's seconds-left, immune to clock skew
+  const canvasOps = useRef([]); // ops currently on the canvas, replayed locally on undo_stroke
 
   const playSound = (type) => {
     const sounds = { win: 'https://assets.mixkit.co/active_storage/sfx/2000/2000-preview.mp3', turn: 'https://assets.mixkit.co/active_storage/sfx/2578/2578-preview.mp3' };
@@ -281,6 +283,23 @@ function Game() {
     ctx.beginPath(); ctx.moveTo(prevX, prevY); ctx.lineTo(currX, currY); ctx.stroke();
   };
 
+  const drawPolyline = (ctx, points, color) => {
+    ctx.lineCap = 'round'; ctx.lineJoin = 'round'; ctx.lineWidth = 4; ctx.strokeStyle = color;
+    ctx.beginPath(); ctx.moveTo(points[0], points[1]);
+    for (let i = 2; i < points.length; i += 2) ctx.lineTo(points[i], points[i + 1]);
+    ctx.stroke();
+  };
+
+  // Shared decoder for live draw_batch ops and redraw history
+  const applyOps = (ctx, ops) => {
+    const dpr = window.devicePixelRatio || 1;
+    ops.forEach(a => {
+      if (a.type === 'draw') drawOnCanvas(ctx, a.prevX, a.prevY, a.currX, a.currY, a.color);
+      else if (a.type === 'stroke') drawPolyline(ctx, a.points, a.color);
+      else if (a.type === 'fill') floodFill(ctx, Math.floor(a.x * dpr), Math.floor(a.y * dpr), a.color);
+    });
+  };
+
   const floodFill = (ctx, startX, startY, fillColor) => {
     const w = ctx.canvas.width; const h = ctx.canvas.height;
     const img = ctx.getImageData(0, 0, w, h); const data = img.data;
@@ -302,47 +321,48 @@ function Game() {
     const handleResize = () => setIsMobile(window.innerWidth <= 768);
     window.addEventListener('resize', handleResize);
     const BACKEND = "ws://192.168.29.52:8000";
-    const socket = new WebSocket(BACKEND + `/ws/${roomId}/${name}`);
-    socketRef.current = socket;
-
-    const connect = () => {
-        if (socket.readyState === 1) return;
-        // Reconnection logic could go here
-    }
+    const FRAME_TICK_MS = 33; // ask the server to batch draw events for this room
+    let closed = false;
 
-    socket.onopen = () => console.log("Connected");
-    socket.onclose = () => console.log("Disconnected");
+    const startCountdown = (seconds) => { roundEnd.current = Date.now() + seconds * 1000; setTimeLeft(seconds); };
+    const countdown = setInterval(() => {
+      if (roundEnd.current) setTimeLeft(Math.max(0, Math.ceil((roundEnd.current - Date.now()) / 1000)));
+    }, 250);
 
-    socket.onmessage = (event) => {
+    const handleMessage = (event) => {
       const data = JSON.parse(event.data);
       const ctx = canvasRef.current?.getContext('2d', { willReadFrequently: true });
       switch (data.type) {
-        case 'draw': if (ctx) drawOnCanvas(ctx, data.prevX, data.prevY, data.currX, data.currY, data.color); break;
+        case 'draw': canvasOps.current.push(data); if (ctx) drawOnCanvas(ctx, data.prevX, data.prevY, data.currX, data.currY, data.color); break;
         case 'fill': 
+            canvasOps.current.push(data);
             const dpr = window.devicePixelRatio || 1;
             if (ctx) floodFill(ctx, Math.floor(data.x * dpr), Math.floor(data.y * dpr), data.color); 
             break;
-        case 'clear': if (ctx) ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height); break;
+        case 'draw_batch': canvasOps.current.push(...data.ops); if (ctx) applyOps(ctx, data.ops); break;
+        case 'clear': canvasOps.current = []; if (ctx) ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height); break;
         case 'redraw': 
+            canvasOps.current = [...data.history];
             if (ctx) { 
                 ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height); 
-                data.history.forEach(a => {
-                    if (a.type === 'draw') drawOnCanvas(ctx, a.prevX, a.prevY, a.currX, a.currY, a.color);
-                    else if (a.type === 'fill') {
-                        const dpr = window.devicePixelRatio || 1;
-                        floodFill(ctx, Math.floor(a.x * dpr), Math.floor(a.y * dpr), a.color);
-                    }
-                }); 
+                applyOps(ctx, data.history);
+            } break;
+        case 'undo_stroke':
+            canvasOps.current = canvasOps.current.filter(a => a.strokeId !== data.strokeId);
+            if (ctx) {
+                ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height);
+                applyOps(ctx, canvasOps.current);
             } break;
         case 'new_round': 
           setIsGameStarted(true);
+          canvasOps.current = [];
           if (ctx) ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height); 
-          setRole(data.role); setWordHint(data.word); setWordChoices([]); 
+          setRole(data.role); setWordHint(data.word); setWordChoices([]); startCountdown(data.round_time);
           setMessages(p => [...p, { message: `New Round! Drawer: ${data.drawer_name || "?"}`, isSystem: true }]); if (data.role === 'drawer') playSound('turn'); 
           break;
         case 'choose_word': setWordChoices(data.words); setIsGameStarted(true); break;
         case 'choosing': setWordHint("Choosing..."); setIsGameStarted(true); setMessages(p => [...p, { message: data.message, isSystem: true }]); break;
-        case 'timer': setTimeLeft(data.time); break;
+        case 'timer': startCountdown(data.time); break;
         case 'hint_update': setWordHint(data.word); break;
         case 'chat': setMessages(p => [...p, data]); break;
         case 'correct_guess': setMessages(p => [...p, { message: data.message, isSystem: true }]); setLeaderboard(data.scores); playSound('win'); confetti({ particleCount: 150, spread: 70, origin: { y: 0.6 } }); break;
@@ -350,13 +370,29 @@ function Game() {
             setRole(data.role); 
             setWordHint(data.word); 
             setLeaderboard(data.scores);
+            if (data.deadline) startCountdown(data.time);
             if (data.word && data.word !== "Waiting...") setIsGameStarted(true);
             break;
       }
     };
+
+    const connect = () => {
+        const socket = new WebSocket(BACKEND + `/ws/${roomId}/${name}?tick=${FRAME_TICK_MS}`);
+        socketRef.current = socket;
+        socket.onopen = () => console.log("Connected");
+        socket.onclose = (e) => {
+            console.log("Disconnected");
+            // 1012: the server is draining and the room moved to another worker
+            if (e.code === 1012 && !closed) setTimeout(connect, 500);
+        };
+        socket.onmessage = handleMessage;
+    };
+    connect();
     
     return () => {
-        if (socket.readyState === 1) socket.close();
+        closed = true;
+        if (socketRef.current.readyState === 1) socketRef.current.close();
+        clearInterval(countdown);
         window.removeEventListener('resize', handleResize);
     };
   }, [roomId, name]);